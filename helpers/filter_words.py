@@ -1,30 +1,179 @@
-import pandas as pd
-import os
-import csv,json
+import os,sys
+import csv
+import argparse
+from collections import Counter
+from contextlib import ExitStack
+from itertools import groupby
 from numerize.numerize import numerize
 
-def compute_difference_and_save(json_path, csv_path, output_file_path):
-    # Read the CSV files into dataframes
-    dct=json.load(open(json_path))
-    words=[row[0] for row in csv.reader(open(csv_path, newline=''))][1:]
-    print(f'No of words in the current dictionary {numerize(len(dct.keys()),3)}\n')
-    print(f'No of words in the current csv file is {numerize(len(words),3)}\n')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','src'))
+from bindict import BinaryDictionary,is_bindict,iter_dictionary_items
+from dict_io import external_sort
+from bloom import load_or_build_bloom
 
-    unq_words={"words":list(set(words)-set(dct.keys()))}
 
-    os.makedirs(os.path.dirname(output_file_path),exist_ok=True)
+def iter_csv_words(csv_paths, column_name=None):
+    """
+    Stream (word, count) pairs from word CSV files.
 
-    # Save unq_words to a CSV file
-    df=pd.DataFrame(unq_words)
-    
-    print(f'No of unique words that need to be transliterated {numerize(int(df.size),3)}\n')
-    df.to_csv(output_file_path,index=False)
+    Args:
+        csv_paths (list of str): CSV files with a header row.
+        column_name (str): Column holding the words, defaults to the first column. A `count`
+            column, if present, gives the frequency of each row, otherwise every row counts once.
+    """
+    csv.field_size_limit(sys.maxsize)
+    for csv_path in csv_paths:
+        with open(csv_path,newline='',encoding='utf-8') as file:
+            reader=csv.reader(file)
+            header=next(reader,None)
+            if header is None:
+                continue
+            index=header.index(column_name) if column_name else 0
+            count_index=header.index('count') if 'count' in header and header[index]!='count' else None
+            for row in reader:
+                if len(row)>index and row[index]:
+                    yield row[index],int(row[count_index]) if count_index is not None else 1
 
+
+def word_frequencies(pairs, run_size=1000000, tmp_dir=None):
+    """
+    Total the counts of (word, count) pairs with bounded memory, yielding them sorted by word.
+
+    Counts are summed in memory for every `run_size` input rows before the partial totals are
+    externally sorted, so repeated words only reach the disk once per run.
+    """
+    def partial_counts():
+        counts=Counter()
+        for rows,(word,count) in enumerate(pairs,1):
+            counts[word]+=count
+            if rows%run_size==0:
+                yield from counts.items()
+                counts.clear()
+        yield from counts.items()
+
+    ordered=external_sort(partial_counts(),key=lambda entry:entry[0],run_size=run_size,tmp_dir=tmp_dir)
+    for word,entries in groupby(ordered,key=lambda entry:entry[0]):
+        yield word,sum(count for _,count in entries)
+
+
+def sorted_dictionary_keys(path, run_size=1000000, tmp_dir=None):
+    """
+    Stream the keys of a dictionary in sorted order, binary dictionaries are stored sorted.
+    """
+    if is_bindict(path):
+        with BinaryDictionary(path) as dictionary:
+            yield from dictionary.keys()
+        return
+    keys=(key for key,_ in iter_dictionary_items(path))
+    yield from external_sort(keys,run_size=run_size,tmp_dir=tmp_dir)
+
+
+def missing_words(frequencies, dictionary_keys):
+    """
+    Merge join two word sorted streams, yielding the (word, count) pairs absent from the keys.
+    """
+    keys=iter(dictionary_keys)
+    key=next(keys,None)
+    for word,count in frequencies:
+        while key is not None and key<word:
+            key=next(keys,None)
+        if key!=word:
+            yield word,count
+
+
+def probe_missing_words(frequencies, dictionary, bloom):
+    """
+    Yield the (word, count) pairs absent from a binary dictionary, only words the bloom filter
+    does not rule out are looked up.
+    """
+    for word,count in frequencies:
+        if word not in bloom or word not in dictionary:
+            yield word,count
+
+
+def compute_difference_and_save(json_path, csv_path, output_file_path, column_name=None, run_size=1000000, tmp_dir=None, use_bloom=False):
+    """
+    Write the words of the CSV files that are missing from a dictionary, most frequent first.
+
+    Both sides are streamed as word sorted runs on disk and merge joined, so neither the CSV nor
+    the dictionary has to fit in memory. With `use_bloom` a binary dictionary is not scanned,
+    each csv word is checked against its bloom filter and only possible members are looked up.
+
+    Args:
+        json_path (str): JSON or binary dictionary.
+        csv_path (str or list of str): Word CSV files.
+        output_file_path (str): CSV file to store the missing words and their counts.
+        column_name (str): Column holding the words, defaults to the first column.
+        run_size (int): Entries held in memory per sorted run.
+        tmp_dir (str): Directory for the sorted runs.
+        use_bloom (bool): Probe a binary dictionary through its bloom filter instead of merging.
+
+    Returns:
+        int: Number of missing words.
+    """
+    csv_paths=[csv_path] if isinstance(csv_path,str) else list(csv_path)
+    stats=Counter()
+
+    def counted(items,name):
+        for item in items:
+            stats[name]+=1
+            yield item
+
+    if use_bloom and not is_bindict(json_path):
+        raise ValueError(f'Probing through a bloom filter needs a binary dictionary, not {json_path}')
+    frequencies=counted(word_frequencies(iter_csv_words(csv_paths,column_name),run_size,tmp_dir),'csv_words')
+    # the binary dictionary is probed lazily while the missing words are written
+    with ExitStack() as stack:
+        if use_bloom:
+            dictionary=stack.enter_context(BinaryDictionary(json_path))
+            stats['dictionary_words']=len(dictionary)
+            dictionary_keys=iter(())
+            missing=probe_missing_words(frequencies,dictionary,load_or_build_bloom(json_path))
+        else:
+            dictionary_keys=counted(sorted_dictionary_keys(json_path,run_size,tmp_dir),'dictionary_words')
+            missing=missing_words(frequencies,dictionary_keys)
+        by_frequency=external_sort(missing,key=lambda entry:(-entry[1],entry[0]),run_size=run_size,tmp_dir=tmp_dir)
+
+        directory=os.path.dirname(output_file_path)
+        if directory:
+            os.makedirs(directory,exist_ok=True)
+        tmp_path=f'{output_file_path}.tmp'
+        count=0
+        with open(tmp_path,'w',newline='',encoding='utf-8') as file:
+            writer=csv.writer(file)
+            writer.writerow(['words','count'])
+            for word,frequency in by_frequency:
+                writer.writerow([word,frequency])
+                count+=1
+        os.replace(tmp_path,output_file_path)
+        # the merge stops at the last csv word, count the dictionary keys left after it
+        for _ in dictionary_keys:
+            pass
+
+    print(f'No of words in the current dictionary {numerize(stats["dictionary_words"],3)}\n')
+    print(f'No of words in the current csv file is {numerize(stats["csv_words"],3)}\n')
+    print(f'No of unique words that need to be transliterated {numerize(count,3)}\n')
     print(f"Output saved to {output_file_path}")
+    return count
+
 
-# Example usage
 if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='List the words of CSV files missing from a dictionary, sorted by frequency.')
+    parser.add_argument('--dictionary_path', type=str, required=True, help='JSON or binary (.xdict) dictionary')
+    parser.add_argument('--csv_paths', nargs='+', required=True, help='Word CSV files, a count column is used as the word frequency')
+    parser.add_argument('--output_path', type=str, required=True, help='CSV file to store the missing words')
+    parser.add_argument('--column_name', type=str, default=None, help='Column holding the words, defaults to the first column')
+    parser.add_argument('--run_size', type=int, default=1000000, help='Entries held in memory per sorted run')
+    parser.add_argument('--tmp_dir', type=str, default=None, help='Directory for the sorted runs')
+    parser.add_argument('--bloom', action='store_true', help='Probe a binary dictionary through its bloom filter instead of scanning it')
+    args = parser.parse_args()
+
     compute_difference_and_save(
-        "san_Deva.json", 
-        "unique_words/san_Deva.csv", 
-        'new_unq_words/san_Deva.csv')
+        args.dictionary_path,
+        args.csv_paths,
+        args.output_path,
+        args.column_name,
+        args.run_size,
+        args.tmp_dir,
+        args.bloom
+        )
@@ -0,0 +1,158 @@
+import json,os,sys
+import time
+import argparse
+import statistics
+import subprocess
+from datetime import datetime,timezone
+
+SRC_DIR=os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','src')
+sys.path.append(SRC_DIR)
+
+default_modules=['main','transliterate_unique_words','get_unique_words','MemoryWordReplacer','normalizer','service']
+default_scripts=['main.py','transliterate_unique_words.py','get_unique_words.py']
+
+
+def import_time(module, top=5):
+    """
+    Measure the import of a module in a fresh interpreter with `python -X importtime`.
+
+    Args:
+        module (str): Module of src to import.
+        top (int): Number of heaviest direct imports to report.
+
+    Returns:
+        dict: Cumulative import time of the module in milliseconds and its heaviest direct
+            imports, or the error if the import failed.
+    """
+    result=subprocess.run(
+        [sys.executable,'-X','importtime','-c',f'import {module}'],
+        cwd=SRC_DIR,capture_output=True,text=True
+        )
+    if result.returncode!=0:
+        return {'ms':None,'error':result.stderr.strip().splitlines()[-1]}
+    total,direct=None,[]
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _,cumulative,name=line.split('|',2)
+        depth=(len(name)-len(name.lstrip()))//2
+        name=name.strip()
+        # the module itself is at depth 0 and its own imports at depth 1, reported before it
+        if depth==1:
+            direct.append((name,int(cumulative)/1000))
+        elif depth==0:
+            if name==module:
+                total=int(cumulative)/1000
+                break
+            direct=[]
+    heaviest=sorted(direct,key=lambda item:-item[1])[:top]
+    return {'ms':total,'heaviest':[{'module':name,'ms':ms} for name,ms in heaviest]}
+
+
+def help_time(script, repeats=3):
+    """
+    Median wall time in seconds of `python <script> --help`, None if it fails.
+    """
+    times=[]
+    for _ in range(repeats):
+        start=time.perf_counter()
+        result=subprocess.run([sys.executable,script,'--help'],cwd=SRC_DIR,capture_output=True)
+        if result.returncode!=0:
+            return None
+        times.append(time.perf_counter()-start)
+    return statistics.median(times)
+
+
+def first_batch(dataset_path, file_type, dictionary_path, src_lang, text_column, batch_size, cache_dir):
+    """
+    Time a fresh `main.py` run up to its first replaced batch, stage by stage.
+
+    The stages run in a child interpreter so the imports are measured cold, the same way a
+    short per-language invocation pays for them.
+
+    Returns:
+        dict: Seconds since the child was started at the end of each stage.
+    """
+    start=time.time()
+    result=subprocess.run(
+        [sys.executable,os.path.abspath(__file__),'first-batch',
+         '--dataset_path',dataset_path,'--file_type',file_type,'--dictionary_path',dictionary_path,
+         '--src_lang',src_lang,'--text_column',text_column,'--batch_size',str(batch_size),
+         *(['--cache_dir',cache_dir] if cache_dir else [])],
+        cwd=SRC_DIR,capture_output=True,text=True
+        )
+    if result.returncode!=0:
+        raise RuntimeError(f'First batch run failed:\n{result.stderr}')
+    stamps=json.loads(result.stdout.strip().splitlines()[-1])
+    return {stage:stamp-start for stage,stamp in stamps.items()}
+
+
+def run_first_batch(args):
+    from glob import glob
+    stamps={}
+    import main
+    from MemoryWordReplacer import MemoryWordReplacer
+    stamps['imports']=time.time()
+    ds=main.load_corpus(args.file_type,glob(args.dataset_path),args.cache_dir,[args.text_column],args.text_column,1,args.batch_size)
+    stamps['corpus']=time.time()
+    replacer=MemoryWordReplacer(args.dictionary_path,src_lang=args.src_lang)
+    stamps['dictionary']=time.time()
+    replacer.replace_batches(ds[args.text_column])
+    stamps['first_batch']=time.time()
+    print(json.dumps(stamps))
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the startup of the pipeline scripts.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    report = subparsers.add_parser('report', help='Measure import times, --help latency and optionally the time to the first batch')
+    report.add_argument('--modules', nargs='+', default=default_modules, help='Modules of src whose import is timed')
+    report.add_argument('--scripts', nargs='+', default=default_scripts, help='Scripts of src whose --help is timed')
+    report.add_argument('--output_path', type=str, default=None, help='JSON lines file the report is appended to, to track startup across changes')
+    report.add_argument('--max_import_ms', type=float, default=None, help='Exit with an error if a module takes longer to import')
+    for subparser in (report,subparsers.add_parser('first-batch', help='Run the first batch of main.py in this process and print stage timestamps')):
+        subparser.add_argument('--dataset_path', type=str, default=None, help='Glob path for dataset files, enables the time to first batch')
+        subparser.add_argument('--file_type', type=str, default='parquet', choices=['csv','parquet','arrow'])
+        subparser.add_argument('--dictionary_path', type=str, default=None, help='Dictionary of the language')
+        subparser.add_argument('--src_lang', type=str, default='hin_Deva', help='Source language of the text')
+        subparser.add_argument('--text_column', type=str, default='translated', help='Column holding the text')
+        subparser.add_argument('--batch_size', type=int, default=16, help='Rows of the first batch')
+        subparser.add_argument('--cache_dir', type=str, default=None, help='Cache directory of the datasets library')
+    args = parser.parse_args()
+
+    if args.command=='first-batch':
+        run_first_batch(args)
+        raise SystemExit(0)
+
+    results={
+        'created':datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python':sys.version.split()[0],
+        'imports':{module:import_time(module) for module in args.modules},
+        'help_seconds':{script:help_time(script) for script in args.scripts},
+    }
+    for module,result in results['imports'].items():
+        if result['ms'] is None:
+            print(f'import {module}: failed, {result["error"]}')
+            continue
+        heaviest=', '.join(f'{item["module"]} {item["ms"]:.0f}ms' for item in result['heaviest'])
+        print(f'import {module}: {result["ms"]:.0f}ms ({heaviest})')
+    for script,seconds in results['help_seconds'].items():
+        print(f'{script} --help: '+(f'{seconds:.2f}s' if seconds is not None else 'failed'))
+
+    if args.dataset_path:
+        if not args.dictionary_path:
+            parser.error('--dictionary_path is required with --dataset_path')
+        results['first_batch']=first_batch(
+            args.dataset_path,args.file_type,args.dictionary_path,args.src_lang,
+            args.text_column,args.batch_size,args.cache_dir
+            )
+        print('Time to first batch: '+', '.join(f'{stage} {seconds:.2f}s' for stage,seconds in results['first_batch'].items()))
+
+    if args.output_path:
+        with open(args.output_path,'a') as file:
+            file.write(json.dumps(results)+'\n')
+        print(f'Report appended to {args.output_path}')
+
+    slow=[module for module,result in results['imports'].items() if args.max_import_ms and (result['ms'] or 0)>args.max_import_ms]
+    if slow:
+        raise SystemExit(f'Imports over {args.max_import_ms}ms: {slow}')
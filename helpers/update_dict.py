@@ -1,6 +1,16 @@
-import json,os
+import json,os,sys
+import heapq
+import argparse
+from collections import Counter
+from itertools import groupby
 from numerize.numerize import numerize
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','src'))
+from dict_io import external_sort,write_json_dict
+from bindict import iter_dictionary_items,is_bindict,write_bindict
+
+conflict_policies=['last-wins','first-wins','keep-most-frequent']
+
 
 def combine_json_files(input_paths, output_path):
     combined_dict = {}
@@ -17,12 +27,102 @@ def combine_json_files(input_paths, output_path):
         json.dump(combined_dict, file, indent=4,ensure_ascii=False)
     print(f'sucessfully saved in {output_path}')
 
+
+def sorted_entries(path, input_index, presorted=False, run_size=1000000, tmp_dir=None):
+    """
+    Stream the entries of a dictionary as (key, input_index, position, value) sorted by key.
+
+    The position keeps the file order of repeated keys so the last one still wins within a file.
+    Binary dictionaries are stored sorted and are never sorted again.
+    """
+    entries=((key,input_index,position,value) for position,(key,value) in enumerate(iter_dictionary_items(path)))
+    if presorted or is_bindict(path):
+        return entries
+    return external_sort(entries,key=lambda entry:(entry[0],entry[2]),run_size=run_size,tmp_dir=tmp_dir)
+
+
+def resolve_conflict(entries, policy):
+    """
+    Pick the value of a key from all its (key, input_index, position, value) entries.
+
+    Args:
+        entries (list): Entries of one key ordered by input and position.
+        policy (str): 'last-wins', 'first-wins' or 'keep-most-frequent'; ties of the latter
+            go to the value seen last.
+
+    Returns:
+        The chosen value.
+    """
+    if policy=='first-wins':
+        return entries[0][3]
+    if policy=='keep-most-frequent' and len(entries)>1:
+        values=[json.dumps(entry[3],ensure_ascii=False,sort_keys=True) for entry in entries]
+        counts=Counter(values)
+        last_seen={value:i for i,value in enumerate(values)}
+        best=max(counts,key=lambda value:(counts[value],last_seen[value]))
+        return entries[last_seen[best]][3]
+    return entries[-1][3]
+
+
+def merge_json_files(input_paths, output_path, policy='last-wins', presorted=False, run_size=1000000, tmp_dir=None):
+    """
+    Merge dictionaries with a streaming k-way merge in bounded memory.
+
+    Every input is turned into sorted runs on disk (unless it is already sorted by key), the runs
+    of all inputs are merged lazily and conflicting keys are resolved by `policy`. The result is
+    written sorted by key, one entry per line, or as a binary dictionary if `output_path` ends in
+    `.xdict`.
+
+    Args:
+        input_paths (list of str): JSON or binary dictionaries to merge, later inputs are newer.
+        output_path (str): Path of the merged dictionary.
+        policy (str): Conflict policy, one of `conflict_policies`.
+        presorted (bool): Inputs are already sorted by key and can be merged directly.
+        run_size (int): Entries held in memory per sorted run.
+        tmp_dir (str): Directory for the sorted runs.
+
+    Returns:
+        int: Number of entries in the merged dictionary.
+    """
+    if policy not in conflict_policies:
+        raise ValueError(f'Unknown conflict policy {policy}, expected one of {conflict_policies}')
+    streams=[
+        sorted_entries(path,input_index,presorted,run_size,tmp_dir)
+        for input_index,path in enumerate(input_paths)
+        ]
+    merged=heapq.merge(*streams,key=lambda entry:(entry[0],entry[1],entry[2]))
+    conflicts=0
+
+    def resolved():
+        nonlocal conflicts
+        for key,entries in groupby(merged,key=lambda entry:entry[0]):
+            entries=list(entries)
+            conflicts+=len({entry[1] for entry in entries})>1
+            yield key,resolve_conflict(entries,policy)
+
+    if is_bindict(output_path):
+        metadata={'sources':[os.path.basename(path) for path in input_paths],'policy':policy}
+        count=write_bindict(resolved(),output_path,metadata=metadata,presorted=True,tmp_dir=tmp_dir)
+    else:
+        count=write_json_dict(resolved(),output_path)
+    print(f'No of words in a combined dictionary is {numerize(count,3)} ({numerize(conflicts,3)} keys resolved by {policy})')
+    print(f'sucessfully saved in {output_path}')
+    return count
+
+
 if __name__=='__main__':
-    lang='urd_Arab'
-    path_1=f'/dictionary/{lang}.json'
-    path_2=f'/dictionary_2/{lang}.json'
-    # input_paths=glob(f'{lang}/*chunk*/*json')
-    input_paths=[path_1,path_2]
-    print(input_paths)
-    output_path=f'universal_dictionary/{lang}.json'
-    combine_json_files(input_paths,output_path)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Merge transliteration dictionaries into one.')
+    parser.add_argument('--input_paths', nargs='+', required=True, help='Dictionaries to merge, later ones are newer')
+    parser.add_argument('--output_path', type=str, required=True, help='Path of the merged dictionary, a binary dictionary if it ends in .xdict')
+    parser.add_argument('--policy', type=str, choices=conflict_policies, default='last-wins', help='How to resolve keys present in several inputs')
+    parser.add_argument('--presorted', action='store_true', help='Inputs are already sorted by key, skip building sorted runs')
+    parser.add_argument('--run_size', type=int, default=1000000, help='Entries held in memory per sorted run')
+    parser.add_argument('--tmp_dir', type=str, default=None, help='Directory for the sorted runs')
+    parser.add_argument('--in_memory', action='store_true', help='Load every input into memory instead of merging in a stream')
+    args = parser.parse_args()
+
+    print(args.input_paths)
+    if args.in_memory:
+        combine_json_files(args.input_paths,args.output_path)
+    else:
+        merge_json_files(args.input_paths,args.output_path,args.policy,args.presorted,args.run_size,args.tmp_dir)
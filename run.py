@@ -0,0 +1,320 @@
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+root=os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(root,'src'))
+from normalizer import mapping_dict
+
+
+class Stage:
+    """
+    One command of the pipeline with the files it reads and writes.
+
+    The stage key hashes the command line and the content of every input file, so a stage only
+    reruns when a parameter or an input actually changed.
+    """
+    def __init__(self, name:str, command:list, inputs:list, outputs:list, deps:list=(), workers:int=1)->None:
+        """
+        Args:
+            name (str): Name of the stage, unique per language.
+            command (list of str): Command line, `{workers}` is replaced by the granted workers.
+            inputs (list of str): Files or glob patterns read by the stage.
+            outputs (list of str): Files or directories written by the stage.
+            deps (list of str): Stages that have to finish first.
+            workers (int): Workers the stage can make use of.
+        """
+        self.name=name
+        self.command=command
+        self.inputs=inputs
+        self.outputs=outputs
+        self.deps=list(deps)
+        self.workers=workers
+
+
+class WorkerBudget:
+    """
+    Counting semaphore shared by all languages, stages acquire as many workers as they can use.
+    """
+    def __init__(self, total:int)->None:
+        self.total=total
+        self.free=total
+        self.condition=threading.Condition()
+
+    def acquire(self, wanted:int)->int:
+        wanted=max(1,min(wanted,self.total))
+        with self.condition:
+            self.condition.wait_for(lambda:self.free>=wanted)
+            self.free-=wanted
+        return wanted
+
+    def release(self, granted:int)->None:
+        with self.condition:
+            self.free+=granted
+            self.condition.notify_all()
+
+
+class FileHasher:
+    """
+    Content hashes of files, memoized by (size, mtime) so unchanged inputs are not read again.
+    """
+    def __init__(self, path:str)->None:
+        self.path=path
+        self.lock=threading.Lock()
+        self.hashes={}
+        if os.path.exists(path):
+            with open(path) as file:
+                self.hashes=json.load(file)
+
+    def file_hash(self, path:str)->str:
+        stat=os.stat(path)
+        fingerprint=f'{stat.st_size}:{stat.st_mtime_ns}'
+        with self.lock:
+            entry=self.hashes.get(path)
+        if entry and entry[0]==fingerprint:
+            return entry[1]
+        digest=hashlib.blake2b(digest_size=16)
+        with open(path,'rb') as file:
+            for block in iter(lambda:file.read(1<<20),b''):
+                digest.update(block)
+        with self.lock:
+            self.hashes[path]=[fingerprint,digest.hexdigest()]
+        return digest.hexdigest()
+
+    def tree_hash(self, pattern:str)->str:
+        """
+        Hash of every file matched by a glob pattern, or found below a directory.
+        """
+        paths=[]
+        for match in sorted(glob.glob(pattern)):
+            if os.path.isdir(match):
+                paths.extend(sorted(
+                    os.path.join(directory,name)
+                    for directory,_,names in os.walk(match) for name in names
+                    ))
+            else:
+                paths.append(match)
+        digest=hashlib.blake2b(digest_size=16)
+        for path in paths:
+            digest.update(f'{os.path.relpath(path)}={self.file_hash(path)}\n'.encode('utf-8'))
+        return f'{len(paths)}:{digest.hexdigest()}'
+
+    def save(self)->None:
+        with self.lock:
+            with open(f'{self.path}.tmp','w') as file:
+                json.dump(self.hashes,file)
+            os.replace(f'{self.path}.tmp',self.path)
+
+
+def language_stages(lang:str, args)->list:
+    """
+    The pipeline of one language: unique words, missing words, transliteration, dictionary
+    update and replacement of the corpus.
+    """
+    python=sys.executable
+    work=lambda *parts:os.path.join(args.work_dir,*parts)
+    dataset=args.dataset_path.format(lang=lang)
+    dictionary=args.dictionary_path.format(lang=lang)
+    unique_words=work('unique_words',f'{lang}.csv')
+    new_words=work('new_words',f'{lang}.csv')
+    transliterated_words=work('transliterated_words',f'{lang}.json')
+    updated_dictionary=work('dictionaries',f'{lang}.json')
+    workers=args.stage_workers or max(1,args.max_workers//len(args.langs))
+    return [
+        Stage(
+            'unique_words',
+            [python,os.path.join(root,'src','get_unique_words.py'),'--input_path',dataset,'--file_type',args.file_type,
+             '--src_lang',lang,'--column_name',args.text_column,'--batch_size',str(args.batch_size),
+             '--cache_dir',args.cache_dir,'--output_csv_path',work('unique_words'),'--num_proc','{workers}'],
+            inputs=[dataset],
+            outputs=[unique_words],
+            workers=workers,
+            ),
+        Stage(
+            'filter_words',
+            [python,os.path.join(root,'helpers','filter_words.py'),'--dictionary_path',dictionary,
+             '--csv_paths',unique_words,'--output_path',new_words],
+            inputs=[dictionary,unique_words],
+            outputs=[new_words],
+            deps=['unique_words'],
+            ),
+        Stage(
+            'transliterate',
+            [python,os.path.join(root,'src','transliterate_unique_words.py'),'--input_path',new_words,'--column_name','words',
+             '--src_lang',lang,'--batch_size',str(args.xlit_batch_size),'--cache_dir',args.cache_dir,
+             '--output_json_path',work('transliterated_words'),'--num_workers','{workers}','--streaming'],
+            inputs=[new_words],
+            outputs=[transliterated_words],
+            deps=['filter_words'],
+            workers=workers,
+            ),
+        Stage(
+            'update_dict',
+            [python,os.path.join(root,'helpers','update_dict.py'),'--input_paths',dictionary,transliterated_words,
+             '--output_path',updated_dictionary],
+            inputs=[dictionary,transliterated_words],
+            outputs=[updated_dictionary],
+            deps=['transliterate'],
+            ),
+        Stage(
+            'replace',
+            [python,os.path.join(root,'src','main.py'),'--dictionary_path',updated_dictionary,'--cache_dir',args.cache_dir,
+             '--dataset_path',dataset,'--text_column',args.text_column,'--id_column',args.id_column,
+             '--file_type',args.file_type,'--missing_log_path',work('missing_words')+os.sep,'--src_lang',lang,
+             '--batch_size',str(args.batch_size),'--output_path',work('transliterated',lang),'--num_proc','{workers}'],
+            inputs=[dataset,updated_dictionary],
+            outputs=[work('transliterated',lang)],
+            deps=['update_dict'],
+            workers=workers,
+            ),
+    ]
+
+
+class Pipeline:
+    """
+    Runs the stages of several languages, skipping stages whose stamp matches their key.
+
+    Every language runs in its own thread and its stages in dependency order, all languages
+    draw workers from one `WorkerBudget`. A stage is valid when its stamp in
+    `<work_dir>/.stamps` holds the current key and its outputs are unchanged since it ran.
+    """
+    def __init__(self, work_dir:str, max_workers:int, force:bool=False)->None:
+        self.work_dir=work_dir
+        self.stamp_dir=os.path.join(work_dir,'.stamps')
+        os.makedirs(self.stamp_dir,exist_ok=True)
+        self.budget=WorkerBudget(max_workers)
+        self.hasher=FileHasher(os.path.join(work_dir,'.file_hashes.json'))
+        self.force=force
+        self.print_lock=threading.Lock()
+
+    def log(self, lang:str, message:str)->None:
+        with self.print_lock:
+            print(f'[{lang}] {message}',flush=True)
+
+    def stage_key(self, stage:Stage)->str:
+        digest=hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps(stage.command).encode('utf-8'))
+        for pattern in stage.inputs:
+            digest.update(f'{pattern}={self.hasher.tree_hash(pattern)}\n'.encode('utf-8'))
+        return digest.hexdigest()
+
+    def outputs_fingerprint(self, stage:Stage)->list:
+        fingerprints=[]
+        for path in stage.outputs:
+            if not os.path.exists(path):
+                return None
+            stat=os.stat(path)
+            fingerprints.append([path,stat.st_size,stat.st_mtime_ns])
+        return fingerprints
+
+    def is_valid(self, stamp_path:str, key:str, stage:Stage)->bool:
+        if self.force or not os.path.exists(stamp_path):
+            return False
+        with open(stamp_path) as file:
+            stamp=json.load(file)
+        return stamp['key']==key and stamp['outputs']==self.outputs_fingerprint(stage)
+
+    def run_stage(self, lang:str, stage:Stage)->bool:
+        """
+        Run a stage unless its outputs are valid.
+
+        Returns:
+            bool: Whether the stage ran.
+        """
+        stamp_path=os.path.join(self.stamp_dir,f'{lang}.{stage.name}.json')
+        key=self.stage_key(stage)
+        if self.is_valid(stamp_path,key,stage):
+            self.log(lang,f'{stage.name}: up to date')
+            return False
+        granted=self.budget.acquire(stage.workers)
+        try:
+            command=[part.replace('{workers}',str(granted)) for part in stage.command]
+            for path in stage.outputs:
+                os.makedirs(os.path.dirname(path.rstrip(os.sep)) or '.',exist_ok=True)
+            self.log(lang,f'{stage.name}: running with {granted} workers')
+            start=time.perf_counter()
+            log_path=os.path.join(self.work_dir,'logs',f'{lang}.{stage.name}.log')
+            os.makedirs(os.path.dirname(log_path),exist_ok=True)
+            with open(log_path,'w') as log:
+                result=subprocess.run(command,stdout=log,stderr=subprocess.STDOUT,cwd=root)
+            if result.returncode!=0:
+                raise RuntimeError(f'{lang} {stage.name} failed with exit code {result.returncode}, see {log_path}')
+            self.log(lang,f'{stage.name}: done in {time.perf_counter()-start:.1f}s')
+        finally:
+            self.budget.release(granted)
+        outputs=self.outputs_fingerprint(stage)
+        if outputs is None:
+            raise RuntimeError(f'{lang} {stage.name} did not write {stage.outputs}')
+        with open(stamp_path,'w') as file:
+            json.dump({'key':key,'command':stage.command,'outputs':outputs},file,indent=4)
+        self.hasher.save()
+        return True
+
+    def run_language(self, lang:str, stages:list, selected:list=None)->int:
+        """
+        Run the stages of one language in dependency order.
+
+        Returns:
+            int: Number of stages that ran.
+        """
+        done,ran=set(),0
+        pending={stage.name:stage for stage in stages}
+        while pending:
+            ready=[stage for stage in pending.values() if set(stage.deps)<=done]
+            if not ready:
+                raise ValueError(f'Stages {list(pending)} of {lang} have missing or cyclic dependencies')
+            for stage in ready:
+                if selected is None or stage.name in selected:
+                    ran+=self.run_stage(lang,stage)
+                done.add(stage.name)
+                del pending[stage.name]
+        return ran
+
+    def run(self, language_stages:dict, selected:list=None)->dict:
+        """
+        Run every language concurrently.
+
+        Args:
+            language_stages (dict): Mapping of each language to its stages.
+            selected (list of str): Only run these stages, all by default.
+
+        Returns:
+            dict: Number of stages that ran per language.
+        """
+        with ThreadPoolExecutor(max_workers=len(language_stages) or 1) as executor:
+            futures={
+                lang:executor.submit(self.run_language,lang,stages,selected)
+                for lang,stages in language_stages.items()
+                }
+            return {lang:future.result() for lang,future in futures.items()}
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='Run the transliteration pipeline for several languages, skipping stages whose inputs did not change.')
+    parser.add_argument('--langs', nargs='+', required=True, choices=list(mapping_dict), help='Languages to process (e.g., hin_Deva tam_Taml)')
+    parser.add_argument('--dataset_path', type=str, required=True, help='Glob path of the dataset files, {lang} is replaced by the language')
+    parser.add_argument('--dictionary_path', type=str, required=True, help='Current dictionary of each language, {lang} is replaced by the language')
+    parser.add_argument('--work_dir', type=str, default='pipeline', help='Directory for the outputs of every stage')
+    parser.add_argument('--file_type', type=str, choices=['csv','parquet','arrow'], default='parquet', help='dataset file type')
+    parser.add_argument('--text_column', type=str, default='translated', help='Column holding the text')
+    parser.add_argument('--id_column', type=str, default='doc_id', help='Column holding the document IDs')
+    parser.add_argument('--cache_dir', type=str, default='.cache', help='Cache directory for Hugging Face datasets')
+    parser.add_argument('--batch_size', type=int, default=16, help='Batch size of the corpus stages')
+    parser.add_argument('--xlit_batch_size', type=int, default=64, help='Batch size of the transliteration model')
+    parser.add_argument('--max_workers', type=int, default=os.cpu_count(), help='Workers shared by all languages')
+    parser.add_argument('--stage_workers', type=int, default=None, help='Workers of a parallel stage, defaults to an even share of --max_workers per language')
+    parser.add_argument('--stages', nargs='*', default=None, help='Only run these stages')
+    parser.add_argument('--force', action='store_true', help='Run stages even if their outputs are up to date')
+    args = parser.parse_args()
+
+    pipeline=Pipeline(args.work_dir,args.max_workers,args.force)
+    ran=pipeline.run({lang:language_stages(lang,args) for lang in args.langs},args.stages)
+    for lang,count in ran.items():
+        print(f'{lang}: {count} stages ran')
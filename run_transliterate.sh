@@ -6,7 +6,7 @@ python src/main.py \
         --text_column "${tgt_lang}" \
         --id_column "doc_id" \
         --num_proc  8\
-        --batch_size  10\
+        --adaptive_batches\
         --output_path "transliteration/${tgt_lang}_transliterated" \
         --file_type 'parquet' \
         --missing_log_path "missing_words/"\
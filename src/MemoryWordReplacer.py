@@ -1,12 +1,15 @@
 import re
 from flashtext import KeywordProcessor
 from normalizer import normalize,indic_script_patterns
+from line_cache import LineCache
 
 class MemoryWordReplacer:
-    def __init__(self,dictionary_path:str,src_lang:str)->None:
+    def __init__(self,dictionary_path:str,src_lang:str,line_cache:LineCache=None)->None:
         self.kw_processor=KeywordProcessor()
         self.dictionary=self.kw_processor.add_keyword_from_file(dictionary_path)
         self.src_lang=src_lang
+        # optional cache of line outputs, repeated lines are then transliterated once
+        self.line_cache=line_cache
         self.script_suffix=src_lang.split('_')[-1]
         self.compiled_patterns()
         self.load_script_patterns()
@@ -177,6 +180,85 @@ class MemoryWordReplacer:
 
     
     def replace_batches(self, batch:list, use_placeholder:bool=True)->tuple[list,list]:
+        """
+        Processes a batch of text lines, replacing words based on the dictionary and handling mixed scripts.
+
+        Repeated lines are served from `line_cache` when one is set.
+
+        Args:
+            batch (list): List of text lines to process.
+            use_placeholder (bool): Flag to use a placeholder for batch processing.
+
+        Returns:
+            tuple: A tuple containing the processed text batch and a list of missing words.
+        """
+        if self.line_cache is not None and self.dictionary:
+            return self.replace_batches_deduplicated(batch, use_placeholder)
+        return self._replace_batches(batch, use_placeholder)
+
+
+    def replace_batches_deduplicated(self, batch:list, use_placeholder:bool=True)->tuple[list,list]:
+        """
+        Same as `replace_batches`, transliterating every distinct line once per cache lifetime.
+
+        Rows are split into lines. Lines found in `line_cache`, or repeated within the batch,
+        reuse their output and the remaining distinct lines are transliterated together as one
+        batch. Surrounding whitespace of a line is kept as is and not part of its cache key.
+
+        Args:
+            batch (list): List of text lines to process.
+            use_placeholder (bool): Flag to use a placeholder for batch processing.
+
+        Returns:
+            tuple: A tuple containing the processed text batch and a list of missing words.
+        """
+        cache=self.line_cache
+        rows,resolved,pending=[],{},{}
+        for text in batch:
+            lines=[]
+            for line in (text or '').split('\n'):
+                core=line.strip()
+                key=cache.key(core) if core else None
+                lines.append((line,key))
+                if key is None:
+                    continue
+                if key in resolved or key in pending:
+                    cache.hits+=1
+                    continue
+                value=cache.get(key)
+                if value is None:
+                    pending[key]=core
+                else:
+                    resolved[key]=value
+            rows.append(lines)
+
+        if pending:
+            transliterated,missing_words=self._replace_batches(list(pending.values()), use_placeholder)
+            if len(transliterated)!=len(pending):
+                transliterated,missing_words=self._replace_batches(list(pending.values()), use_placeholder=False)
+            for key,text,missing in zip(pending,transliterated,missing_words):
+                resolved[key]=(text,[word for word in missing if word])
+                cache.put(key,resolved[key])
+
+        fixed_batch,missing_words=[],[]
+        for lines in rows:
+            parts,missing=[],[]
+            for line,key in lines:
+                if key is None:
+                    parts.append(line)
+                    continue
+                text,words=resolved[key]
+                core=line.strip()
+                start=line.index(core)
+                parts.append(line[:start]+text+line[start+len(core):])
+                missing.extend(words)
+            fixed_batch.append('\n'.join(parts))
+            missing_words.append(missing or [''])
+        cache.save_stats()
+        return fixed_batch, missing_words
+
+
+    def _replace_batches(self, batch:list, use_placeholder:bool=True)->tuple[list,list]:
 
         """
         Processes a batch of text lines, replacing words based on the dictionary and handling mixed scripts.
@@ -215,7 +297,7 @@ class MemoryWordReplacer:
         missing_words = [self.extract_script_words(sent) or [''] for sent in fixed_batch]
 
         if len(batch) != len(fixed_batch):
-            fixed_batch = self.replace_batches(batch, use_placeholder=False)
+            fixed_batch = self._replace_batches(batch, use_placeholder=False)
 
         return fixed_batch, missing_words
 
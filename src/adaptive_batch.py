@@ -0,0 +1,171 @@
+import os
+import time
+from worker_stats import WorkerStatsFile,read_worker_stats
+
+
+def current_rss()->int:
+    """
+    Resident memory of this process in bytes, its peak where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1])*os.sysconf('SC_PAGE_SIZE')
+    except (OSError,ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*1024
+
+
+class AdaptiveBatcher:
+    """
+    Replaces rows in batches sized by a budget of characters tuned from their measured cost.
+
+    Rows handed over by `ds.map` are split into batches of at most `budget` characters, so
+    long documents make small batches and short ones large batches. The budget starts at
+    `initial_chars` and doubles every `window` batches while the throughput in characters per
+    second improves by more than `tolerance`, then settles on the best budget seen. A batch
+    slower than `max_latency` seconds, or leaving the process above `max_memory` bytes, halves
+    the budget and caps it there. Each process tunes its own budget and writes its statistics
+    to `stats_dir` after every call, to be summed with `merge_batch_stats`.
+
+    It exposes `replace_batches` like `MemoryWordReplacer`, so it can stand in for it.
+    """
+    def __init__(self, replacer, initial_chars:int=16384, min_chars:int=1024, max_chars:int=4194304,
+                 max_latency:float=2.0, max_memory:int=None, window:int=3, tolerance:float=0.05, stats_dir:str=None)->None:
+        """
+        Args:
+            replacer (MemoryWordReplacer): Replacer the batches are sent to.
+            initial_chars (int): Starting budget of characters per batch.
+            min_chars (int): Lowest budget, a single longer row is still sent on its own.
+            max_chars (int): Highest budget.
+            max_latency (float): Seconds a batch may take before the budget is halved.
+            max_memory (int): Resident bytes of the process above which the budget is halved.
+            window (int): Batches measured at each budget while growing.
+            tolerance (float): Relative throughput gain needed to keep growing.
+            stats_dir (str): Directory for the per process statistics files.
+        """
+        self.replacer=replacer
+        self.budget=initial_chars
+        self.min_chars=min_chars
+        self.ceiling=max_chars
+        self.max_latency=max_latency
+        self.max_memory=max_memory
+        self.window=window
+        self.tolerance=tolerance
+        self.stats_dir=stats_dir
+        self.stats_file=WorkerStatsFile(stats_dir) if stats_dir is not None else None
+        self.growing=True
+        self.best_throughput,self.best_budget=0.0,initial_chars
+        self.window_chars=self.window_batches=0
+        self.window_seconds=0.0
+        self.batches=self.rows=self.chars=self.backoffs=self.peak_rss=0
+        self.seconds=0.0
+
+    def split(self, texts:list)->list[tuple[int,int]]:
+        """
+        Split rows into consecutive (start, end) slices of at most `budget` characters each.
+        """
+        slices,start,size=[],0,0
+        for i,text in enumerate(texts):
+            length=len(text) if text else 0
+            if i>start and size+length>self.budget:
+                slices.append((start,i))
+                start,size=i,0
+            size+=length
+        if start<len(texts):
+            slices.append((start,len(texts)))
+        return slices
+
+    def record(self, rows:int, chars:int, seconds:float)->None:
+        """
+        Account for a finished batch and adjust the budget.
+        """
+        self.batches+=1
+        self.rows+=rows
+        self.chars+=chars
+        self.seconds+=seconds
+        rss=current_rss()
+        self.peak_rss=max(self.peak_rss,rss)
+        if seconds>self.max_latency or (self.max_memory and rss>self.max_memory):
+            self.ceiling=self.budget=max(self.min_chars,self.budget//2)
+            self.best_budget=min(self.best_budget,self.budget)
+            self.growing=False
+            self.backoffs+=1
+            return
+        # batches cut short by the end of the rows of a map call say little about the budget
+        if not self.growing or chars<self.budget//2:
+            return
+        self.window_chars+=chars
+        self.window_seconds+=seconds
+        self.window_batches+=1
+        if self.window_batches<self.window:
+            return
+        throughput=self.window_chars/max(self.window_seconds,1e-9)
+        self.window_chars=self.window_batches=0
+        self.window_seconds=0.0
+        if throughput>self.best_throughput*(1+self.tolerance):
+            self.best_throughput,self.best_budget=throughput,self.budget
+            if self.budget*2<=self.ceiling:
+                self.budget*=2
+            else:
+                self.growing=False
+        else:
+            self.budget=self.best_budget
+            self.growing=False
+
+    def replace_batches(self, batch:list, use_placeholder:bool=True)->tuple[list,list]:
+        """
+        Same as `MemoryWordReplacer.replace_batches`, sending the rows in budget sized batches.
+        """
+        transliterated,missing_words=[],[]
+        for start,end in self.split(batch):
+            rows=batch[start:end]
+            begin=time.perf_counter()
+            texts,words=self.replacer.replace_batches(rows,use_placeholder)
+            self.record(len(rows),sum(len(text) for text in rows if text),time.perf_counter()-begin)
+            transliterated.extend(texts)
+            missing_words.extend(words)
+        self.save_stats()
+        return transliterated,missing_words
+
+    def stats(self)->dict:
+        return {
+            'batches':self.batches,
+            'rows':self.rows,
+            'chars':self.chars,
+            'seconds':self.seconds,
+            'backoffs':self.backoffs,
+            'budget':self.budget,
+            'peak_rss':self.peak_rss,
+        }
+
+    def save_stats(self)->None:
+        """
+        Write the statistics of this process to `<stats_dir>/worker-<pid>.json`.
+
+        Nothing is written by a process that has not replaced any batch, such as the parent of
+        the worker processes.
+        """
+        if self.stats_file is None or not self.batches:
+            return
+        self.stats_file.write(self.stats())
+
+
+def merge_batch_stats(stats_dir:str)->dict:
+    """
+    Sum the statistics written by every process.
+
+    Returns:
+        dict: Total batches, rows, characters, seconds and backoffs, the number of workers,
+            the budgets they settled on, their highest resident memory and the overall
+            throughput in characters per second.
+    """
+    totals={'batches':0,'rows':0,'chars':0,'seconds':0.0,'backoffs':0,'workers':0,'budgets':[],'peak_rss':0}
+    for stats in read_worker_stats(stats_dir):
+        for name in ('batches','rows','chars','seconds','backoffs'):
+            totals[name]+=stats[name]
+        totals['budgets'].append(stats['budget'])
+        totals['peak_rss']=max(totals['peak_rss'],stats['peak_rss'])
+        totals['workers']+=1
+    totals['budgets'].sort()
+    totals['throughput']=totals['chars']/totals['seconds'] if totals['seconds'] else 0.0
+    return totals
@@ -0,0 +1,108 @@
+import numpy as np
+import pyarrow as pa
+
+_separator='\x00'
+
+
+def decode_string_array(array)->list[str]:
+    """
+    Decode an Arrow string array into python strings with a single UTF-8 decode.
+
+    The data buffer of the whole batch is decoded at once and rows are sliced out of the
+    resulting string. Byte offsets are turned into character offsets by counting the UTF-8
+    lead bytes before each of them, instead of decoding every row on its own.
+
+    Args:
+        array (pa.StringArray, pa.LargeStringArray or pa.ChunkedArray): Text column of a batch.
+
+    Returns:
+        list of str: Rows of the batch, nulls become empty strings.
+    """
+    if isinstance(array,pa.ChunkedArray):
+        array=array.combine_chunks() if array.num_chunks!=1 else array.chunk(0)
+    if len(array)==0:
+        return []
+    if array.null_count:
+        array=array.fill_null('')
+    offset_type=np.int64 if pa.types.is_large_string(array.type) else np.int32
+    _,offsets_buffer,data_buffer=array.buffers()
+    offsets=np.frombuffer(offsets_buffer,dtype=offset_type,count=len(array)+1,offset=array.offset*np.dtype(offset_type).itemsize)
+    start=int(offsets[0])
+    data=np.frombuffer(data_buffer,dtype=np.uint8,count=int(offsets[-1])-start,offset=start) if data_buffer else np.zeros(0,np.uint8)
+    text=data.tobytes().decode('utf-8')
+
+    # a character starts at every byte that is not a UTF-8 continuation byte (10xxxxxx)
+    char_starts=np.empty(len(data)+1,dtype=np.int64)
+    char_starts[0]=0
+    np.cumsum((data&0xC0)!=0x80,out=char_starts[1:])
+    bounds=char_starts[offsets-start].tolist()
+    return [text[bounds[i]:bounds[i+1]] for i in range(len(array))]
+
+
+def _encode_joined(strings:list[str]):
+    """
+    Encode strings into one UTF-8 data buffer and int32 offsets, encoding them all at once.
+
+    Returns:
+        tuple: (offsets, data) numpy arrays, or None if a string holds the separator character.
+    """
+    joined=_separator.join(strings).encode('utf-8')
+    data=np.frombuffer(joined,dtype=np.uint8)
+    separators=np.flatnonzero(data==0)
+    if len(separators)!=max(len(strings)-1,0):
+        return None
+    offsets=np.empty(len(strings)+1,dtype=np.int64)
+    offsets[0]=0
+    # every separator before a row shifts its start by one once separators are dropped
+    offsets[1:-1]=separators-np.arange(len(separators))
+    offsets[-1]=len(data)-len(separators)
+    if offsets[-1]>np.iinfo(np.int32).max:
+        return None
+    return offsets.astype(np.int32),data[data!=0] if len(separators) else data
+
+
+def encode_string_array(strings:list[str])->pa.StringArray:
+    """
+    Build an Arrow string array from its offsets and data buffers instead of row by row.
+    """
+    encoded=_encode_joined(strings) if strings else None
+    if encoded is None:
+        return pa.array(strings,type=pa.string())
+    offsets,data=encoded
+    return pa.StringArray.from_buffers(len(strings),pa.py_buffer(offsets),pa.py_buffer(data))
+
+
+def encode_list_array(lists:list[list[str]])->pa.ListArray:
+    """
+    Build an Arrow list of strings array from flattened values and list offsets.
+    """
+    lengths=np.fromiter((len(words) for words in lists),dtype=np.int32,count=len(lists))
+    list_offsets=np.zeros(len(lists)+1,dtype=np.int32)
+    np.cumsum(lengths,out=list_offsets[1:])
+    values=encode_string_array([word for words in lists for word in words])
+    return pa.ListArray.from_arrays(pa.array(list_offsets,type=pa.int32()),values)
+
+
+def replace_arrow_batch(mem_replacer, table:pa.Table, text_column:str, out_columns=('transliterated','missing_words'))->pa.Table:
+    """
+    Run `replace_batches` on an Arrow batch and append its outputs as Arrow columns.
+
+    Meant for `Dataset.map` on an arrow formatted dataset, it skips the conversion of the batch
+    to python lists and of the outputs back to Arrow done by the datasets library.
+
+    Args:
+        mem_replacer (MemoryWordReplacer): Replacer holding the dictionary.
+        table (pa.Table): Batch of the dataset.
+        text_column (str): Column holding the text to transliterate.
+        out_columns (tuple of str): Names of the transliterated text and missing words columns.
+
+    Returns:
+        pa.Table: The batch with both output columns appended.
+    """
+    texts=decode_string_array(table.column(text_column))
+    transliterated,missing_words=mem_replacer.replace_batches(texts)
+    for name,column in zip(out_columns,(encode_string_array(transliterated),encode_list_array(missing_words))):
+        if name in table.column_names:
+            table=table.drop([name])
+        table=table.append_column(name,column)
+    return table
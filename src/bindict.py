@@ -0,0 +1,237 @@
+import os
+import sys
+import json
+import mmap
+import struct
+import shutil
+import tempfile
+import argparse
+from array import array
+from itertools import groupby
+from datetime import datetime,timezone
+from dict_io import iter_json_dict,external_sort,write_json_dict
+
+# Layout (little endian):
+#   magic (8 bytes) | version (uint32) | header length (uint32) | header JSON, padded to 8 bytes
+#   entry count (uint64)
+#   key offsets (count+1 x uint64) | value offsets (count+1 x uint64)
+#   keys blob (UTF-8, sorted) | values blob (UTF-8)
+# Offsets are relative to the start of their blob, entry i spans offsets[i]:offsets[i+1].
+MAGIC=b'XLITDICT'
+VERSION=1
+BINDICT_SUFFIX='.xdict'
+_prefix=struct.Struct('<8sII')
+_count=struct.Struct('<Q')
+
+
+def is_bindict(path:str)->bool:
+    return path.lower().endswith(BINDICT_SUFFIX)
+
+
+def write_bindict(items, output_path:str, metadata:dict=None, presorted:bool=False, tmp_dir:str=None)->int:
+    """
+    Write (key, value) string pairs to a binary dictionary.
+
+    Keys are stored sorted by their UTF-8 bytes, which matches python string order, so lookups
+    can binary search. Blobs and offsets are spilled to temporary files while writing, memory
+    use does not depend on the size of the dictionary.
+
+    Args:
+        items (iterable): (key, value) pairs, entries whose value is not a string are skipped.
+        output_path (str): Path of the binary dictionary.
+        metadata (dict): Extra header fields, e.g. the language.
+        presorted (bool): Items are already sorted by key and unique, otherwise they are sorted
+            externally and the last value of a repeated key wins.
+        tmp_dir (str): Directory for temporary files, defaults to the output directory.
+
+    Returns:
+        int: Number of entries written.
+    """
+    directory=os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory,exist_ok=True)
+    items=((key,value) for key,value in items if isinstance(value,str))
+    if not presorted:
+        positioned=((key,position,value) for position,(key,value) in enumerate(items))
+        ordered=external_sort(positioned,key=lambda entry:(entry[0],entry[1]),tmp_dir=tmp_dir or directory)
+        items=((key,list(entries)[-1][2]) for key,entries in groupby(ordered,key=lambda entry:entry[0]))
+
+    work_dir=tempfile.mkdtemp(prefix='bindict_',dir=tmp_dir or directory)
+    try:
+        parts=['key_offsets','value_offsets','keys','values']
+        files={part:open(os.path.join(work_dir,part),'wb') for part in parts}
+        key_offsets,value_offsets=array('Q',[0]),array('Q',[0])
+        key_end=value_end=count=0
+        previous=None
+        for key,value in items:
+            if previous is not None and key<=previous:
+                raise ValueError(f'Keys must be sorted and unique, got {key!r} after {previous!r}')
+            previous=key
+            key_bytes,value_bytes=key.encode('utf-8'),value.encode('utf-8')
+            files['keys'].write(key_bytes)
+            files['values'].write(value_bytes)
+            key_end+=len(key_bytes)
+            value_end+=len(value_bytes)
+            key_offsets.append(key_end)
+            value_offsets.append(value_end)
+            count+=1
+            if len(key_offsets)>=65536:
+                key_offsets.tofile(files['key_offsets'])
+                value_offsets.tofile(files['value_offsets'])
+                key_offsets,value_offsets=array('Q'),array('Q')
+        key_offsets.tofile(files['key_offsets'])
+        value_offsets.tofile(files['value_offsets'])
+        for file in files.values():
+            file.close()
+
+        header=json.dumps({
+            'format_version':VERSION,
+            'created':datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'count':count,
+            **(metadata or {}),
+        },ensure_ascii=False).encode('utf-8')
+        header+=b' '*(-(_prefix.size+len(header))%8)
+
+        tmp_path=f'{output_path}.tmp'
+        with open(tmp_path,'wb') as output:
+            output.write(_prefix.pack(MAGIC,VERSION,len(header)))
+            output.write(header)
+            output.write(_count.pack(count))
+            for part in parts:
+                with open(os.path.join(work_dir,part),'rb') as file:
+                    shutil.copyfileobj(file,output,1<<20)
+        os.replace(tmp_path,output_path)
+    finally:
+        shutil.rmtree(work_dir,ignore_errors=True)
+    return count
+
+
+class BinaryDictionary:
+    """
+    Read-only, memory-mapped view of a binary dictionary.
+
+    Opening is O(1) whatever the size, lookups binary search the sorted keys in O(log n) and
+    iteration yields entries in key order. Pages are shared between processes mapping the same
+    file.
+    """
+    def __init__(self, path:str)->None:
+        self.path=path
+        self.file=open(path,'rb')
+        self.mmap=mmap.mmap(self.file.fileno(),0,access=mmap.ACCESS_READ)
+        magic,version,header_length=_prefix.unpack_from(self.mmap,0)
+        if magic!=MAGIC:
+            raise ValueError(f'{path} is not a binary dictionary')
+        if version!=VERSION:
+            raise ValueError(f'{path} has format version {version}, only version {VERSION} is supported')
+        position=_prefix.size
+        self.metadata=json.loads(self.mmap[position:position+header_length])
+        position+=header_length
+        (self.count,)=_count.unpack_from(self.mmap,position)
+        position+=_count.size
+
+        view=memoryview(self.mmap)
+        offsets_size=8*(self.count+1)
+        self.key_offsets=view[position:position+offsets_size].cast('Q')
+        position+=offsets_size
+        self.value_offsets=view[position:position+offsets_size].cast('Q')
+        position+=offsets_size
+        self.keys_start=position
+        self.values_start=position+self.key_offsets[self.count]
+
+    def _key_bytes(self, index:int)->bytes:
+        return self.mmap[self.keys_start+self.key_offsets[index]:self.keys_start+self.key_offsets[index+1]]
+
+    def _value(self, index:int)->str:
+        start=self.values_start+self.value_offsets[index]
+        return self.mmap[start:self.values_start+self.value_offsets[index+1]].decode('utf-8')
+
+    def _find(self, key:str)->int:
+        target=key.encode('utf-8')
+        low,high=0,self.count
+        while low<high:
+            middle=(low+high)//2
+            if self._key_bytes(middle)<target:
+                low=middle+1
+            else:
+                high=middle
+        if low<self.count and self._key_bytes(low)==target:
+            return low
+        return -1
+
+    def get(self, key:str, default=None):
+        index=self._find(key)
+        return self._value(index) if index>=0 else default
+
+    def __getitem__(self, key:str)->str:
+        index=self._find(key)
+        if index<0:
+            raise KeyError(key)
+        return self._value(index)
+
+    def __contains__(self, key:str)->bool:
+        return self._find(key)>=0
+
+    def __len__(self)->int:
+        return self.count
+
+    def keys(self):
+        for index in range(self.count):
+            yield self._key_bytes(index).decode('utf-8')
+
+    __iter__=keys
+
+    def items(self):
+        for index in range(self.count):
+            yield self._key_bytes(index).decode('utf-8'),self._value(index)
+
+    def close(self)->None:
+        self.key_offsets.release()
+        self.value_offsets.release()
+        self.mmap.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc)->None:
+        self.close()
+
+
+def iter_dictionary_items(path:str):
+    """
+    Stream the entries of a JSON or binary dictionary, binary ones come in key order.
+    """
+    if is_bindict(path):
+        with BinaryDictionary(path) as dictionary:
+            yield from dictionary.items()
+    else:
+        yield from iter_json_dict(path)
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='Convert dictionaries between JSON and the binary dictionary format.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    to_binary = subparsers.add_parser('import', help='Convert a JSON dictionary to the binary format')
+    to_binary.add_argument('json_path', type=str)
+    to_binary.add_argument('output_path', type=str)
+    to_binary.add_argument('--language', type=str, default=None, help='Language of the dictionary (e.g., hin_Deva)')
+    to_json = subparsers.add_parser('export', help='Convert a binary dictionary to JSON')
+    to_json.add_argument('bindict_path', type=str)
+    to_json.add_argument('output_path', type=str)
+    info = subparsers.add_parser('info', help='Print the header of a binary dictionary')
+    info.add_argument('bindict_path', type=str)
+    args = parser.parse_args()
+
+    if args.command=='import':
+        count=write_bindict(
+            iter_json_dict(args.json_path),
+            args.output_path,
+            metadata={'language':args.language,'source':os.path.basename(args.json_path)}
+            )
+        print(f'Saved {count} entries in {args.output_path}')
+    elif args.command=='export':
+        count=write_json_dict(iter_dictionary_items(args.bindict_path),args.output_path)
+        print(f'Saved {count} entries in {args.output_path}')
+    else:
+        with BinaryDictionary(args.bindict_path) as dictionary:
+            json.dump(dictionary.metadata,sys.stdout,indent=4,ensure_ascii=False)
+            print()
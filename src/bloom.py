@@ -0,0 +1,187 @@
+import os
+import math
+import time
+import struct
+import argparse
+import tracemalloc
+from hashlib import blake2b
+from numerize.numerize import numerize
+from bindict import BinaryDictionary,is_bindict,iter_dictionary_items
+
+BLOOM_SUFFIX='.bloom'
+_header=struct.Struct('<8sQQQd')
+MAGIC=b'XLBLOOM1'
+
+
+class BloomFilter:
+    """
+    Bloom filter over words, answering "possibly present" or "certainly absent".
+
+    Bit positions come from double hashing of one 128-bit blake2b digest, so they are stable
+    across processes and runs and a filter can be saved next to its dictionary.
+    """
+    def __init__(self, capacity:int, error_rate:float=0.01)->None:
+        """
+        Args:
+            capacity (int): Number of words the filter is sized for.
+            error_rate (float): Target false positive rate at `capacity` words.
+        """
+        capacity=max(capacity,1)
+        self.num_bits=max(8,math.ceil(-capacity*math.log(error_rate)/math.log(2)**2))
+        self.num_hashes=max(1,round(self.num_bits/capacity*math.log(2)))
+        self.bits=bytearray((self.num_bits+7)//8)
+        self.error_rate=error_rate
+        self.count=0
+
+    def _positions(self, word:str):
+        digest=blake2b(word.encode('utf-8'),digest_size=16).digest()
+        first=int.from_bytes(digest[:8],'little')
+        second=int.from_bytes(digest[8:],'little')|1
+        return ((first+i*second)%self.num_bits for i in range(self.num_hashes))
+
+    def add(self, word:str)->None:
+        for position in self._positions(word):
+            self.bits[position>>3]|=1<<(position&7)
+        self.count+=1
+
+    def __contains__(self, word:str)->bool:
+        bits=self.bits
+        return all(bits[position>>3]&(1<<(position&7)) for position in self._positions(word))
+
+    @property
+    def nbytes(self)->int:
+        return len(self.bits)
+
+    def expected_error_rate(self)->float:
+        """
+        False positive rate predicted from the number of words added so far.
+        """
+        return (1-math.exp(-self.num_hashes*self.count/self.num_bits))**self.num_hashes
+
+    def save(self, path:str)->None:
+        tmp_path=f'{path}.tmp'
+        with open(tmp_path,'wb') as file:
+            file.write(_header.pack(MAGIC,self.num_bits,self.num_hashes,self.count,self.error_rate))
+            file.write(self.bits)
+        os.replace(tmp_path,path)
+
+    @classmethod
+    def load(cls, path:str)->'BloomFilter':
+        with open(path,'rb') as file:
+            magic,num_bits,num_hashes,count,error_rate=_header.unpack(file.read(_header.size))
+            if magic!=MAGIC:
+                raise ValueError(f'{path} is not a bloom filter')
+            bloom=cls.__new__(cls)
+            bloom.num_bits,bloom.num_hashes,bloom.count,bloom.error_rate=num_bits,num_hashes,count,error_rate
+            bloom.bits=bytearray(file.read())
+        return bloom
+
+
+def bloom_path(dictionary_path:str)->str:
+    return dictionary_path+BLOOM_SUFFIX
+
+
+def dictionary_keys(dictionary_path:str):
+    # consumers strip dictionary keys, so both spellings are members
+    for key,_ in iter_dictionary_items(dictionary_path):
+        yield key
+        if key.strip()!=key:
+            yield key.strip()
+
+
+def build_bloom(dictionary_path:str, error_rate:float=0.01)->BloomFilter:
+    """
+    Build a bloom filter of the keys of a JSON or binary dictionary and save it next to it.
+
+    Args:
+        dictionary_path (str): Dictionary to index.
+        error_rate (float): Target false positive rate.
+
+    Returns:
+        BloomFilter: The filter, saved to `bloom_path(dictionary_path)`.
+    """
+    if is_bindict(dictionary_path):
+        with BinaryDictionary(dictionary_path) as dictionary:
+            capacity=len(dictionary)
+    else:
+        capacity=sum(1 for _ in dictionary_keys(dictionary_path))
+    bloom=BloomFilter(capacity,error_rate)
+    for key in dictionary_keys(dictionary_path):
+        bloom.add(key)
+    bloom.save(bloom_path(dictionary_path))
+    return bloom
+
+
+def load_or_build_bloom(dictionary_path:str, error_rate:float=0.01)->BloomFilter:
+    """
+    Load the bloom filter saved next to a dictionary, rebuilding it if the dictionary is newer.
+    """
+    path=bloom_path(dictionary_path)
+    if os.path.exists(path) and os.path.getmtime(path)>=os.path.getmtime(dictionary_path):
+        return BloomFilter.load(path)
+    return build_bloom(dictionary_path,error_rate)
+
+
+def measure(dictionary_path:str, error_rate:float=0.01, probes:int=100000)->dict:
+    """
+    Compare a bloom filter with the in-memory set of dictionary keys it stands in for.
+
+    Non-members are probed with reversed dictionary keys, which keep the length and character
+    distribution of real words, so the measured false positive rate reflects real lookups.
+
+    Returns:
+        dict: Sizes, build time, predicted and measured false positive rates and probe timings.
+    """
+    start=time.perf_counter()
+    bloom=build_bloom(dictionary_path,error_rate)
+    build_seconds=time.perf_counter()-start
+
+    tracemalloc.start()
+    keys=set(dictionary_keys(dictionary_path))
+    set_bytes=tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    non_members=[]
+    for key in keys:
+        if key[::-1] not in keys:
+            non_members.append(key[::-1])
+            if len(non_members)>=probes:
+                break
+    members=list(keys)[:probes]
+    assert all(key in bloom for key in members), 'bloom filter rejected a dictionary key'
+
+    start=time.perf_counter()
+    false_positives=sum(word in bloom for word in non_members)
+    bloom_seconds=time.perf_counter()-start
+    start=time.perf_counter()
+    sum(word in keys for word in non_members)
+    set_seconds=time.perf_counter()-start
+
+    return {
+        'keys':len(keys),
+        'bloom_bytes':bloom.nbytes,
+        'set_bytes':set_bytes,
+        'num_hashes':bloom.num_hashes,
+        'build_seconds':build_seconds,
+        'expected_error_rate':bloom.expected_error_rate(),
+        'measured_error_rate':false_positives/max(len(non_members),1),
+        'probes':len(non_members),
+        'bloom_probe_us':bloom_seconds/max(len(non_members),1)*1e6,
+        'set_probe_us':set_seconds/max(len(non_members),1)*1e6,
+    }
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='Build the bloom filter of a dictionary and report its accuracy and size.')
+    parser.add_argument('--dictionary_path', type=str, required=True, help='JSON or binary (.xdict) dictionary')
+    parser.add_argument('--error_rate', type=float, default=0.01, help='Target false positive rate')
+    parser.add_argument('--probes', type=int, default=100000, help='Non-member words probed to measure the false positive rate')
+    args = parser.parse_args()
+
+    stats=measure(args.dictionary_path,args.error_rate,args.probes)
+    print(f'Saved {bloom_path(args.dictionary_path)} for {numerize(stats["keys"],3)} keys in {stats["build_seconds"]:.1f}s')
+    print(f'Memory: bloom filter {numerize(stats["bloom_bytes"],3)}B vs set of keys {numerize(stats["set_bytes"],3)}B '
+          f'({stats["set_bytes"]/max(stats["bloom_bytes"],1):.1f}x smaller, {stats["num_hashes"]} hashes)')
+    print(f'False positive rate: {stats["measured_error_rate"]:.3%} measured on {numerize(stats["probes"],3)} non-members, '
+          f'{stats["expected_error_rate"]:.3%} expected')
+    print(f'Probe time: {stats["bloom_probe_us"]:.2f}us bloom filter, {stats["set_probe_us"]:.2f}us set')
@@ -0,0 +1,80 @@
+import csv
+import time
+import argparse
+from numerize.numerize import numerize
+from normalizer import mapping_dict
+from xlit_engine import engine_config,pin_threads
+from transliterate_unique_words import transliterate,length_bucketed_batches
+
+
+def read_words(input_path,column_name=None,sample_size=None):
+    """
+    Read unique words from a CSV column, or from the first column if no name is given.
+    """
+    words={}
+    with open(input_path,newline='',encoding='utf-8') as file:
+        reader=csv.reader(file)
+        header=next(reader)
+        index=header.index(column_name) if column_name else 0
+        for row in reader:
+            if row and row[index]:
+                words[row[index]]=None
+                if sample_size and len(words)>=sample_size:
+                    break
+    return list(words)
+
+
+def timed_transliterate(words,src_lang,batch_size,quantize):
+    """
+    Transliterate words with the full precision or the quantized engine.
+
+    Returns:
+        tuple: Transliterations aligned with `words` and the words per second of the run,
+            excluding the time spent loading the model.
+    """
+    engine_config['quantize']=quantize
+    # load the model outside of the timed section
+    transliterate(words[:1],src_lang)
+    transliterated=[None]*len(words)
+    start=time.perf_counter()
+    for batch in length_bucketed_batches(words,batch_size):
+        for index,word in zip(batch,transliterate([words[i] for i in batch],src_lang)['transliterated']):
+            transliterated[index]=word
+    return transliterated,len(words)/(time.perf_counter()-start)
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='Compare int8-quantized and full precision IndicXlit outputs on a held-out word list.')
+    parser.add_argument('--input_path', type=str, required=True, help='CSV file with the held-out words')
+    parser.add_argument('--column_name', type=str, default=None, help='Column holding the words, defaults to the first column')
+    parser.add_argument('--src_lang', type=str, required=True, help='Source language (e.g., hin_Deva)')
+    parser.add_argument('--sample_size', type=int, default=5000, help='Number of unique words to compare')
+    parser.add_argument('--batch_size', type=int, default=64, help='Batch size for processing')
+    parser.add_argument('--beam_width', type=int, default=4, help='Beam width of the IndicXlit engine')
+    parser.add_argument('--torch_threads', type=int, default=None, help='Torch intra-op threads')
+    parser.add_argument('--interop_threads', type=int, default=1, help='Torch inter-op threads')
+    parser.add_argument('--disagreements_path', type=str, default=None, help='CSV file to store the words on which both engines disagree')
+    args = parser.parse_args()
+
+    if args.torch_threads:
+        pin_threads(args.torch_threads,args.interop_threads)
+    engine_config['beam_width']=args.beam_width
+
+    words=read_words(args.input_path,args.column_name,args.sample_size)
+    lang_code=mapping_dict[args.src_lang]
+    print(f'Comparing engines on {numerize(len(words),3)} words of {args.src_lang}\n')
+
+    reference,reference_speed=timed_transliterate(words,lang_code,args.batch_size,quantize=False)
+    quantized,quantized_speed=timed_transliterate(words,lang_code,args.batch_size,quantize=True)
+
+    disagreements=[(word,ref,out) for word,ref,out in zip(words,reference,quantized) if ref!=out]
+    print(f'Full precision: {reference_speed:.1f} words/s')
+    print(f'Quantized int8: {quantized_speed:.1f} words/s ({quantized_speed/reference_speed:.2f}x)')
+    print(f'Top-1 agreement: {1-len(disagreements)/max(len(words),1):.2%} ({numerize(len(disagreements),3)} words differ)')
+
+    if args.disagreements_path:
+        with open(args.disagreements_path,'w',newline='',encoding='utf-8') as file:
+            writer=csv.writer(file)
+            writer.writerow(['word','full_precision','quantized'])
+            writer.writerows(disagreements)
+        print(f'Disagreements saved to {args.disagreements_path}')
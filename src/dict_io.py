@@ -0,0 +1,274 @@
+import os
+import json
+import heapq
+import shutil
+import tempfile
+
+
+def iter_json_dict(path:str, chunk_size:int=1<<20):
+    """
+    Stream the (key, value) pairs of a JSON object file without loading it into memory.
+
+    Args:
+        path (str): Path of a JSON file holding a single object.
+        chunk_size (int): Characters read from the file at a time.
+
+    Yields:
+        tuple: (key, value) pairs in file order.
+
+    Raises:
+        ValueError: If the file is not a JSON object.
+    """
+    decoder=json.JSONDecoder()
+    whitespace=' \t\n\r'
+    delimiters=whitespace+',:}]'
+    with open(path,encoding='utf-8') as file:
+        buffer,pos,eof='',0,False
+
+        def fill():
+            nonlocal buffer,pos,eof
+            chunk=file.read(chunk_size)
+            eof=not chunk
+            buffer=buffer[pos:]+chunk
+            pos=0
+            return not eof
+
+        def next_char():
+            nonlocal pos
+            while True:
+                while pos<len(buffer) and buffer[pos] in whitespace:
+                    pos+=1
+                if pos<len(buffer) or not fill():
+                    break
+            if pos>=len(buffer):
+                raise ValueError(f'Unexpected end of {path}')
+            return buffer[pos]
+
+        def decode():
+            nonlocal pos
+            next_char()
+            while True:
+                try:
+                    value,end=decoder.raw_decode(buffer,pos)
+                    # a token is only complete once followed by a delimiter, e.g. a number
+                    # ending at the buffer end may continue in the next chunk
+                    if eof or (end<len(buffer) and buffer[end] in delimiters):
+                        pos=end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                fill()
+
+        if next_char()!='{':
+            raise ValueError(f'{path} does not hold a JSON object')
+        pos+=1
+        if next_char()=='}':
+            return
+        while True:
+            key=decode()
+            if next_char()!=':':
+                raise ValueError(f'Expected ":" after key {key!r} in {path}')
+            pos+=1
+            yield key,decode()
+            separator=next_char()
+            pos+=1
+            if separator=='}':
+                return
+            if separator!=',':
+                raise ValueError(f'Expected "," or "}}" after key {key!r} in {path}')
+
+
+def external_sort(records, key=None, run_size:int=1000000, tmp_dir:str=None):
+    """
+    Sort JSON serialisable records with bounded memory.
+
+    Records are sorted in runs of `run_size`, spilled to temporary JSONL files and lazily
+    k-way merged. Tuples come back as lists.
+
+    Args:
+        records (iterable): Records to sort.
+        key (callable): Sort key, as for `sorted`.
+        run_size (int): Records held in memory at a time.
+        tmp_dir (str): Directory for the sorted runs, defaults to the system temp directory.
+
+    Yields:
+        Records in sorted order.
+    """
+    run_dir=tempfile.mkdtemp(prefix='sorted_runs_',dir=tmp_dir)
+    try:
+        runs,buffer=[],[]
+
+        def spill():
+            path=os.path.join(run_dir,f'run-{len(runs):05d}.jsonl')
+            with open(path,'w',encoding='utf-8') as file:
+                for record in sorted(buffer,key=key):
+                    file.write(json.dumps(record,ensure_ascii=False)+'\n')
+            runs.append(path)
+            buffer.clear()
+
+        for record in records:
+            buffer.append(record)
+            if len(buffer)>=run_size:
+                spill()
+        if not runs:
+            yield from sorted(buffer,key=key)
+            return
+        if buffer:
+            spill()
+
+        def read_run(path):
+            with open(path,encoding='utf-8') as file:
+                for line in file:
+                    yield json.loads(line)
+
+        yield from heapq.merge(*map(read_run,runs),key=key)
+    finally:
+        shutil.rmtree(run_dir,ignore_errors=True)
+
+
+def write_json_dict(items, output_path:str)->int:
+    """
+    Stream (key, value) pairs to a JSON object with one entry per line.
+
+    The file is written next to `output_path` and moved in place once complete, so readers never
+    see a partial dictionary.
+
+    Args:
+        items (iterable): (key, value) pairs in the order they should be written.
+        output_path (str): Path of the JSON file.
+
+    Returns:
+        int: Number of entries written.
+    """
+    directory=os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory,exist_ok=True)
+    tmp_path=f'{output_path}.tmp'
+    count=0
+    with open(tmp_path,'w',encoding='utf-8') as file:
+        file.write('{')
+        for key,value in items:
+            file.write(',\n' if count else '\n')
+            file.write(f'{json.dumps(key,ensure_ascii=False)}: {json.dumps(value,ensure_ascii=False)}')
+            count+=1
+        file.write('\n}\n')
+    os.replace(tmp_path,output_path)
+    return count
+
+
+class ShardWriter:
+    """
+    Append-only JSONL shards of (word, transliteration) pairs with a progress manifest.
+
+    Every appended batch is flushed to the current shard and its byte offset recorded in
+    `manifest.json`, so a restarted run drops any partially written tail, reloads the finished
+    words into `done` and only has to transliterate what is left.
+    """
+    manifest_name='manifest.json'
+
+    def __init__(self, shard_dir:str, shard_size:int=1000000, metadata:dict=None)->None:
+        """
+        Args:
+            shard_dir (str): Directory holding the shards and the manifest.
+            shard_size (int): Entries per shard before a new one is started.
+            metadata (dict): Run settings recorded in the manifest, resuming with different
+                settings raises a ValueError.
+        """
+        os.makedirs(shard_dir,exist_ok=True)
+        self.shard_dir=shard_dir
+        self.shard_size=shard_size
+        self.manifest_path=os.path.join(shard_dir,self.manifest_name)
+        self.manifest={'metadata':metadata or {},'shards':[]}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path,encoding='utf-8') as file:
+                self.manifest=json.load(file)
+            if metadata is not None and self.manifest['metadata']!=metadata:
+                raise ValueError(
+                    f'Checkpoint in {shard_dir} was written with {self.manifest["metadata"]}, '
+                    f'not {metadata}. Remove it to start over.'
+                    )
+        self.done=self.recover()
+        self.file=None
+
+    def recover(self)->dict:
+        """
+        Load the entries of every shard listed in the manifest, truncating unrecorded writes.
+
+        Returns:
+            dict: Mapping of the words already done to their transliteration.
+        """
+        done={}
+        for shard in self.manifest['shards']:
+            path=os.path.join(self.shard_dir,shard['name'])
+            # drop anything appended after the last manifest update
+            with open(path,'r+b') as file:
+                file.truncate(shard['bytes'])
+            with open(path,encoding='utf-8') as file:
+                for line in file:
+                    word,transliteration=json.loads(line)
+                    done[word]=transliteration
+        return done
+
+    def _current_shard(self)->dict:
+        shards=self.manifest['shards']
+        if not shards or shards[-1]['entries']>=self.shard_size:
+            if self.file:
+                self.file.close()
+                self.file=None
+            shards.append({'name':f'part-{len(shards):05d}.jsonl','entries':0,'bytes':0})
+        if self.file is None:
+            # a shard started before a crash may hold bytes the manifest never recorded
+            path=os.path.join(self.shard_dir,shards[-1]['name'])
+            self.file=open(path,'r+b' if os.path.exists(path) else 'wb')
+            self.file.truncate(shards[-1]['bytes'])
+            self.file.seek(shards[-1]['bytes'])
+        return shards[-1]
+
+    def _save_manifest(self)->None:
+        tmp_path=f'{self.manifest_path}.tmp'
+        with open(tmp_path,'w',encoding='utf-8') as file:
+            json.dump(self.manifest,file,ensure_ascii=False)
+        os.replace(tmp_path,self.manifest_path)
+
+    def append(self, items)->None:
+        """
+        Append (word, transliteration) pairs that are not already done and checkpoint them.
+        """
+        lines=[]
+        for word,transliteration in items:
+            if transliteration is None or self.done.get(word)==transliteration:
+                continue
+            self.done[word]=transliteration
+            lines.append(json.dumps([word,transliteration],ensure_ascii=False))
+        if not lines:
+            return
+        shard=self._current_shard()
+        self.file.write(('\n'.join(lines)+'\n').encode('utf-8'))
+        self.file.flush()
+        shard['entries']+=len(lines)
+        shard['bytes']=self.file.tell()
+        self._save_manifest()
+
+    def close(self)->None:
+        if self.file:
+            self.file.close()
+            self.file=None
+
+    def compact(self, output_path:str, write=write_json_dict)->int:
+        """
+        Write every finished entry to a single dictionary.
+
+        Args:
+            output_path (str): Path of the dictionary.
+            write (callable): Writer taking the (word, transliteration) pairs and `output_path`
+                and returning the number of entries written, JSON by default.
+
+        Returns:
+            int: Number of entries in the dictionary.
+        """
+        self.close()
+        count=write(self.done.items(),output_path)
+        self.manifest['compacted']=output_path
+        self._save_manifest()
+        return count
@@ -5,6 +5,7 @@ import io
 import json
 import re 
 from tqdm import tqdm
+from bindict import BinaryDictionary,is_bindict
 
 eng_pattern = re.compile(r'[A-Za-z0-9+]')
 
@@ -312,6 +313,16 @@ class KeywordProcessor(object):
             print(f"An error occurred: {e}")
             return None
 
+    @staticmethod
+    def load_bindict_as_dict(file_path):
+        try:
+            with BinaryDictionary(file_path) as dictionary:
+                data = {k.strip(): v.strip() for k, v in dictionary.items() if eng_pattern.sub('',k).strip()}
+            return {k: data[k] for k in sorted(data, key=lambda k: len(k), reverse=True)}
+        except ValueError as e:
+            print(f"Error reading binary dictionary: {e}")
+            return None
+
     def add_keyword_from_file(self, keyword_file, encoding="utf-8"):
         """To add keywords from a file
 
@@ -333,6 +344,8 @@ class KeywordProcessor(object):
             >>> # python
             >>> # c++
 
+            >>> # Option 3: a JSON or binary dictionary (.xdict) of keyword => clean name
+
             >>> keyword_processor.add_keyword_from_file('keywords.txt')
 
         Raises:
@@ -342,8 +355,11 @@ class KeywordProcessor(object):
         if not os.path.isfile(keyword_file):
             print(keyword_file)
             raise IOError("Invalid file path {}".format(keyword_file))
-        if keyword_file.lower().endswith('json'):
-            dictionary=KeywordProcessor.load_json_as_dict(keyword_file)
+        if keyword_file.lower().endswith('json') or is_bindict(keyword_file):
+            if is_bindict(keyword_file):
+                dictionary=KeywordProcessor.load_bindict_as_dict(keyword_file)
+            else:
+                dictionary=KeywordProcessor.load_json_as_dict(keyword_file)
             cleaned_dictionary={key: value for key, value in dictionary.items() 
                                 if value is not None and not isinstance(value, list)}
             for key,value in tqdm(cleaned_dictionary.items(),desc='Building Trie'):
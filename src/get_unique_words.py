@@ -1,37 +1,139 @@
 import re,os
 import argparse
 from glob import glob
-from datasets import load_dataset,Dataset
+from collections import Counter
+from contextlib import ExitStack
 from numerize.numerize import numerize
+from sketches import HyperLogLog,CountMinSketch,SpaceSaving
+from bloom import load_or_build_bloom
+from prefetch import Prefetcher,read_tables
 
 english_pattern=re.compile(r'[A-Za-z]+')
 punct_no_pattern = re.compile(r'[0-9!"#$%&\'()*+,-./:;<=>?@\[\\\]^_`{|}~\n\t।|॥۔؟]')
 
 
-def get_words(ds,column):
+def tokenize(text):
+    """
+    Split a text into words after removing english words, punctuation, symbols and numbers.
+    """
+    # removing english words
+    text=english_pattern.sub(' ',text)
+    # removing punctuation,symbols and numbers 
+    text=punct_no_pattern.sub(' ',text).strip()
+    return [word for word in text.split() if word]
+
+
+def count_words(ds,column):
 
     """
-    Extract a unique set of words from a specified column in a dataset  by batchwise.
+    Count the words of a specified column in a dataset batchwise.
 
     Args:
         ds: The dataset containing the text data.
         column: The column name in the dataset from which to extract words.
 
     Returns:
-        A list of unique words from the specified column.
+        Counter: Occurrences of every word of the batch.
     """
-    words_set = set()
+    counts = Counter()
     for text in ds[column]:
-        # removing english words
-        text=english_pattern.sub(' ',text)
-        # removing punctuation,symbols and numbers 
-        text=punct_no_pattern.sub(' ',text).strip()
-        words_set.update(word for word in text.split() if word)
-    return list(words_set)
+        if text:
+            counts.update(tokenize(text))
+    return counts
+
+
+def estimate_corpus(ds_path,file_type,column,batch_size,dictionary_path=None,top_k=25,prefetch_depth=0):
+    """
+    Stream a corpus once and estimate its vocabulary in constant memory.
+
+    Distinct words are counted with HyperLogLog, heavy hitters are tracked with SpaceSaving
+    (counts tightened by a Count-Min sketch) and, when a dictionary is given, the share of
+    tokens it already covers is measured along with the distinct words it is missing. Membership
+    is checked against the bloom filter saved next to the dictionary instead of loading it, so
+    coverage may be overstated by the filter's false positive rate.
+
+    Args:
+        ds_path (list): Dataset files to stream.
+        file_type (str): Dataset file type understood by `load_dataset`.
+        column (str): Column holding the text.
+        batch_size (int): Rows read per streamed batch.
+        dictionary_path (str): Optional JSON or binary dictionary to measure coverage against.
+        top_k (int): Number of heavy hitters to report.
+        prefetch_depth (int): If given, parquet row groups or CSV chunks are read this many
+            ahead in a background thread instead of streamed by `load_dataset`.
+
+    Returns:
+        dict: Estimated statistics of the corpus.
+    """
+    dictionary=None
+    if dictionary_path:
+        dictionary=load_or_build_bloom(dictionary_path)
+
+    distinct=HyperLogLog()
+    missing_distinct=HyperLogLog()
+    cms=CountMinSketch()
+    heavy_hitters=SpaceSaving(capacity=max(1000,20*top_k))
+    rows=tokens=covered=0
+
+    with ExitStack() as stack:
+        if prefetch_depth:
+            tables=stack.enter_context(Prefetcher(read_tables(file_type,ds_path,[column],column),prefetch_depth))
+            batches=(table.to_pydict() for table in tables)
+        else:
+            from datasets import load_dataset
+            ds=load_dataset(file_type,data_files=ds_path,streaming=True,split='train')
+            batches=ds.iter(batch_size=batch_size)
+
+        for batch in batches:
+            for text in batch[column]:
+                if not text:
+                    continue
+                rows+=1
+                for word in tokenize(text):
+                    tokens+=1
+                    distinct.add(word)
+                    cms.add(word)
+                    heavy_hitters.add(word)
+                    if dictionary is not None:
+                        if word in dictionary:
+                            covered+=1
+                        else:
+                            missing_distinct.add(word)
+
+    return {
+        'rows':rows,
+        'tokens':tokens,
+        'distinct_words':distinct.count(),
+        'top_words':[
+            (word,min(count,cms.estimate(word)))
+            for word,count,_ in heavy_hitters.top(top_k)
+            ],
+        'dictionary_token_coverage':covered/tokens if dictionary is not None and tokens else None,
+        'missing_distinct_words':missing_distinct.count() if dictionary is not None else None,
+    }
+
+
+def print_estimate(stats,src_lang,batch_size):
+    """
+    Print the output of `estimate_corpus` as a capacity planning report.
+    """
+    print(f'Estimated corpus statistics for the language {src_lang}\n')
+    print(f'Rows: {numerize(stats["rows"],3)}  Tokens: {numerize(stats["tokens"],3)}')
+    print(f'Distinct words (HyperLogLog, ~0.8% error): {numerize(stats["distinct_words"],3)}\n')
+    print(f'Top {len(stats["top_words"])} words:')
+    for word,count in stats['top_words']:
+        print(f'    {word}\t{numerize(count,3)}')
+    to_transliterate=stats['distinct_words']
+    if stats['dictionary_token_coverage'] is not None:
+        to_transliterate=stats['missing_distinct_words']
+        print(f'\nDictionary covers {stats["dictionary_token_coverage"]:.2%} of the tokens')
+        print(f'Distinct words missing from the dictionary: {numerize(to_transliterate,3)}')
+    print(f'\nWords to transliterate: ~{numerize(to_transliterate,3)} '
+          f'(~{numerize(-(-to_transliterate//batch_size),3)} batches of {batch_size})')
 
 
 if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description='Get unique words from a dataset and  store results in a CSV.')
+    parser = argparse.ArgumentParser(description='Get unique words from a dataset with their number of occurrences and store results in a CSV.')
     parser.add_argument('--input_path', type=str, required=True, help='Path to the input arrow file')
     parser.add_argument('--file_type', type=str,choices=['arrow','csv','parquet','json'] ,default='arrow', help='dataset file type')
     parser.add_argument('--src_lang', type=str, required=True, help='src_lang')
@@ -40,10 +142,12 @@ if __name__ == '__main__':
     parser.add_argument('--cache_dir', type=str, default='.cache', help='Cache directory for Hugging Face datasets')
     parser.add_argument('--output_csv_path', type=str, default='output.csv', help='Path to store the output csv file')
     parser.add_argument('--num_proc', type=int, default=1, help='count of CPUS')
+    parser.add_argument('--estimate', action='store_true', help='Only stream the corpus once and report approximate vocabulary statistics')
+    parser.add_argument('--dictionary_path', type=str, default=None, help='JSON or binary dictionary used to estimate coverage in --estimate mode')
+    parser.add_argument('--prefetch_depth', type=int, default=0, help='Stream parquet row groups or CSV chunks, reading up to this many ahead in a background thread, instead of loading the dataset up front')
+    parser.add_argument('--top_k', type=int, default=25, help='Number of heavy hitters reported in --estimate mode')
     args = parser.parse_args()
 
-    os.makedirs(args.output_csv_path,exist_ok=True)
-    
     ds_path=glob(args.input_path)
     file_type=args.file_type
     cache_dir=args.cache_dir
@@ -53,25 +157,44 @@ if __name__ == '__main__':
     src_lang=args.src_lang
     output_path=args.output_csv_path
 
-    ds=load_dataset(
-        file_type,
-        data_files=ds_path,
-        cache_dir=cache_dir,
-        num_proc=num_proc
-        )
+    if args.estimate:
+        stats=estimate_corpus(ds_path,file_type,column,batch_size,args.dictionary_path,args.top_k,args.prefetch_depth)
+        print_estimate(stats,src_lang,batch_size)
+        raise SystemExit(0)
 
+    os.makedirs(output_path,exist_ok=True)
 
-    words_ds=ds['train'].map(
-        lambda x: {'words':get_words(x,column)},
-        batch_size=batch_size,  
-        num_proc=num_proc,
-        remove_columns=ds['train'].column_names,
-        batched=True,
-        desc=f'{numerize(ds['train'].num_rows,3)} words'
-    )
+    from datasets import load_dataset,Dataset
+    if args.prefetch_depth:
+        counts=Counter()
+        with Prefetcher(read_tables(file_type,ds_path,[column],column),args.prefetch_depth) as tables:
+            for table in tables:
+                counts.update(count_words(table.to_pydict(),column))
+        words_ds=Dataset.from_dict({'words':list(counts),'count':list(counts.values())})
+    else:
+        ds=load_dataset(
+            file_type,
+            data_files=ds_path,
+            cache_dir=cache_dir,
+            num_proc=num_proc
+            )
+
+        def batch_counts(batch):
+            counts=count_words(batch,column)
+            return {'words':list(counts),'count':list(counts.values())}
+
+        words_ds=ds['train'].map(
+            batch_counts,
+            batch_size=batch_size,  
+            num_proc=num_proc,
+            remove_columns=ds['train'].column_names,
+            batched=True,
+            desc=f'{numerize(ds['train'].num_rows,3)} words'
+        )
 
-    #Getting unique words from the dataset
-    words_ds=Dataset.from_dict({'words':words_ds.unique('words')})
+        #Totalling the counts of every unique word over the batches
+        totals=words_ds.to_pandas().groupby('words',sort=False)['count'].sum()
+        words_ds=Dataset.from_dict({'words':totals.index.tolist(),'count':totals.tolist()})
 
     print(f'After processed there are  {numerize(words_ds.num_rows,3)} unique words in the language {src_lang}\n')
 
@@ -0,0 +1,76 @@
+from hashlib import blake2b
+from collections import OrderedDict
+from worker_stats import WorkerStatsFile,read_worker_stats
+
+
+class LineCache:
+    """
+    Bounded LRU cache of (transliterated, missing_words) results keyed by a hash of the line.
+
+    Lines are keyed by a 128-bit blake2b digest rather than the text itself, so long
+    boilerplate lines cost a fixed 16 bytes of key. Hit and miss counts of every process are
+    written to its own file under `stats_dir` after every batch, to be summed with
+    `merge_line_stats`.
+    """
+    def __init__(self, capacity:int=100000, stats_dir:str=None)->None:
+        """
+        Args:
+            capacity (int): Lines kept before the least recently used ones are evicted.
+            stats_dir (str): Directory for the per process statistics files.
+        """
+        self.capacity=capacity
+        self.stats_dir=stats_dir
+        self.stats_file=WorkerStatsFile(stats_dir) if stats_dir is not None else None
+        self.entries=OrderedDict()
+        self.hits=self.misses=self.evictions=0
+
+    @staticmethod
+    def key(line:str)->bytes:
+        return blake2b(line.encode('utf-8'),digest_size=16).digest()
+
+    def get(self, key:bytes):
+        value=self.entries.get(key)
+        if value is None:
+            self.misses+=1
+            return None
+        self.entries.move_to_end(key)
+        self.hits+=1
+        return value
+
+    def put(self, key:bytes, value)->None:
+        self.entries[key]=value
+        self.entries.move_to_end(key)
+        if len(self.entries)>self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions+=1
+
+    def stats(self)->dict:
+        return {'lines':self.hits+self.misses,'hits':self.hits,'misses':self.misses,'evictions':self.evictions}
+
+    def save_stats(self)->None:
+        """
+        Write the statistics of this process to `<stats_dir>/worker-<pid>.json`.
+
+        Nothing is written by a process that has not looked up any line, such as the parent
+        of the worker processes.
+        """
+        if self.stats_file is None or not self.hits+self.misses:
+            return
+        self.stats_file.write(self.stats())
+
+
+def merge_line_stats(stats_dir:str)->dict:
+    """
+    Sum the statistics written by every process and compute the dedup ratio.
+
+    Returns:
+        dict: Total lines, hits, misses and evictions, the number of workers and the share of
+            lines served from the cache as `dedup_ratio`.
+    """
+    totals={'lines':0,'hits':0,'misses':0,'evictions':0,'workers':0}
+    for stats in read_worker_stats(stats_dir):
+        for name,value in stats.items():
+            totals[name]+=value
+        totals['workers']+=1
+    totals['dedup_ratio']=totals['hits']/totals['lines'] if totals['lines'] else 0.0
+    return totals
@@ -1,11 +1,18 @@
 import os
+import csv
 import glob
+import json
+import shutil
 import argparse
+from functools import partial
 from numerize.numerize import numerize
 from MemoryWordReplacer import MemoryWordReplacer
-from datasets import load_dataset,disable_caching,Features,Sequence,Value
-
-disable_caching()
+from missing_index import MissingWordIndex
+from line_cache import LineCache,merge_line_stats
+from adaptive_batch import AdaptiveBatcher,merge_batch_stats
+from thread_replace import ThreadedReplacer,gil_enabled
+from prefetch import Prefetcher,read_tables,iter_batches
+from sharding import plan_shards,load_manifest,read_row_groups,shard_name
 
 
 
@@ -20,23 +27,262 @@ def create_dir_if_not_exists(file_path):
         os.makedirs(directory)
         print(f"Directory '{directory}' created")
 
+
+def load_corpus(file_type, dataset_paths, cache_dir, columns, text_column, num_proc, sample_size=None, row_group_units=None):
+    """
+    Load the columns of a corpus, dropping rows without text.
+
+    `row_group_units` of a shard plan, if given, are read instead of `dataset_paths`.
+    """
+    from datasets import load_dataset,DatasetDict
+    if row_group_units:
+        ds=DatasetDict({'train':read_row_groups(row_group_units,columns)})
+    else:
+        ds=load_dataset(
+            file_type,
+            data_files=dataset_paths,
+            cache_dir=cache_dir,
+            num_proc=num_proc,
+        )
+    ds=ds.select_columns(columns)
+    
+    ds=ds.filter(lambda x : x[text_column] not in (None,''),num_proc=num_proc)
+
+    if sample_size:
+        ds = ds['train'].select(range(sample_size))
+    else:
+        ds=ds['train']
+    
+    print(f'{numerize(ds.num_rows)} rows in the dataset with columns {ds.column_names}')
+    return ds
+
+
+def output_features(columns, out_columns):
+    from datasets import Features,Sequence,Value
+    return Features({
+        column:Value("string") for column in columns } | {
+        out_columns[0]: Value("string"),
+        out_columns[1]: Sequence(Value("string"))
+        })
+
+
+def save_outputs(ds, output_path, missing_words_log_path, src_lang, index, id_column, num_proc):
+    """
+    Save the transliterated dataset along with its missing words CSV, and its index if one is given.
+    """
+    df=ds.to_pandas()['missing_words'].explode().drop_duplicates()
+    df.to_csv(f'{missing_words_log_path}/{src_lang}.csv',index=False)
+    if index is not None:
+        index_missing_words(ds,index,id_column)
+        index.close()
+    if ds.num_rows//2>num_proc and num_proc>=40:
+        ds.save_to_disk(output_path,num_proc=40)
+    else:
+        ds.save_to_disk(output_path)
+
+
+def replace_many_languages(job_specs, args, out_columns):
+    """
+    Transliterate the corpora of many languages on one pool of workers.
+
+    Every job is a dictionary with `src_lang`, `dictionary_path`, `dataset_path` and
+    `output_path`, other settings default to the command line arguments. Batches of all jobs
+    are scheduled onto the same pool, written to an Arrow file per job in input order and
+    saved like a single language run once the job is complete. With `--prefetch_depth` the
+    inputs are streamed, the next row groups or CSV chunks being read in a background thread
+    while the current ones are transliterated, instead of being loaded up front.
+
+    Args:
+        job_specs (list of dict): Jobs to run.
+        args (argparse.Namespace): Command line arguments.
+        out_columns (list of str): Names of the transliterated text and missing words columns.
+    """
+    from datasets import Dataset
+    from datasets.arrow_writer import ArrowWriter
+    from replacer_pool import Job,create_replacer_pool,run_jobs
+
+    jobs,outputs=[],{}
+    for spec in job_specs:
+        settings={
+            'text_column':args.text_column,
+            'id_column':args.id_column,
+            'file_type':args.file_type,
+            'other_columns':args.other_columns,
+            'sample_size':args.sample_size,
+            'log_name':spec['src_lang'],
+            'missing_index_path':None,
+            'row_group_units':None,
+            **spec
+            }
+        columns=[*settings['other_columns'],settings['id_column'],settings['text_column']]
+        dataset_paths=settings.get('dataset_paths') or glob.glob(settings['dataset_path'])
+        prefetcher=None
+        if args.prefetch_depth:
+            prefetcher=Prefetcher(
+                read_tables(settings['file_type'],dataset_paths,columns,settings['text_column'],settings['row_group_units']),
+                args.prefetch_depth
+                )
+            batches=iter_batches(prefetcher,args.batch_size,settings['sample_size'])
+        else:
+            ds=load_corpus(
+                settings['file_type'],
+                dataset_paths,
+                args.cache_dir,
+                columns,
+                settings['text_column'],
+                args.num_proc,
+                settings['sample_size'],
+                settings['row_group_units']
+                )
+            batches=ds.iter(batch_size=args.batch_size)
+        tmp_path=f"{settings['output_path'].rstrip(os.sep)}.arrow.tmp"
+        create_dir_if_not_exists(tmp_path)
+        writer=ArrowWriter(features=output_features(columns,out_columns),path=tmp_path)
+
+        def write(batch,result,writer=writer):
+            writer.write_batch({**batch,**dict(zip(out_columns,result))})
+
+        job=Job(settings['src_lang'],settings['dictionary_path'],batches,settings['text_column'],write)
+        outputs[job]=(settings,writer,tmp_path,prefetcher)
+        jobs.append(job)
+
+    def save(job):
+        settings,writer,tmp_path,prefetcher=outputs.pop(job)
+        if prefetcher is not None:
+            prefetcher.close()
+            print(f"{settings['src_lang']} waited {prefetcher.stall_seconds:.1f}s for its inputs")
+        writer.finalize()
+        ds=Dataset.from_file(tmp_path)
+        index=None
+        if settings['missing_index_path'] or args.index_missing_words:
+            index=MissingWordIndex(settings['missing_index_path'] or os.path.join(args.missing_log_path,f"{settings['log_name']}.missing_index.sqlite"))
+        save_outputs(ds,settings['output_path'],args.missing_log_path,settings['log_name'],index,settings['id_column'],args.num_proc)
+        os.remove(tmp_path)
+
+    with create_replacer_pool(args.num_proc,args.max_replacers) as pool:
+        run_jobs(jobs,pool,max_active_languages=args.max_replacers,max_in_flight=2*args.num_proc,on_done=save)
+
+
+def index_missing_words(ds, index, id_column, batch_size=10000):
+    """
+    Rebuild the inverted index of missing words from the `missing_words` column of a run.
+    """
+    index.clear()
+    for batch in ds.select_columns([id_column,'missing_words']).iter(batch_size=batch_size):
+        index.add_documents(batch[id_column],batch['missing_words'])
+    print(f'Indexed the missing words of {numerize(len(index),3)} documents in {index.path}')
+
+
+def reprocess_since_dictionary(mem_replacer, index, output_path, id_column, text_column, out_columns, batch_size, num_proc):
+    """
+    Transliterate again only the documents holding words added to the dictionary since the run.
+
+    Missing words of the index that are now dictionary keys select the affected documents,
+    only those are passed through the replacer and their output rows are patched in the saved
+    dataset. The index is updated with their new missing words.
+
+    Returns:
+        int: Number of documents transliterated again.
+
+    Raises:
+        ValueError: If the IDs of the saved dataset are not unique.
+    """
+    dictionary=mem_replacer.dictionary
+    strip=mem_replacer.remove_punctuations_and_symbols.sub
+    added_words=[word for word in index.words() if word in dictionary or strip('',word) in dictionary]
+    doc_ids=index.documents_for(added_words)
+    print(f'{numerize(len(added_words),3)} missing words are now in the dictionary, found in {numerize(len(doc_ids),3)} documents')
+    if not doc_ids:
+        return 0
+
+    from datasets import load_from_disk
+    ds=load_from_disk(output_path)
+    ids=ds[id_column]
+    if len(set(ids))!=len(ids):
+        raise ValueError(f'{id_column} of {output_path} has repeated IDs, documents of the index can not be matched to rows')
+    indices=[i for i,doc_id in enumerate(ids) if doc_id in doc_ids]
+    affected=ds.select(indices).map(
+        lambda z:dict(zip(out_columns,mem_replacer.replace_batches(z[text_column]))),
+        batched=True,
+        batch_size=batch_size,
+        num_proc=num_proc
+    )
+    # rows of the saved dataset to their new outputs
+    patches=dict(zip(indices,zip(affected[out_columns[0]],affected[out_columns[1]])))
+
+    def patch(transliterated,missing_words,rows):
+        for i,row in enumerate(rows):
+            if row in patches:
+                transliterated[i],missing_words[i]=patches[row]
+        return dict(zip(out_columns,(transliterated,missing_words)))
+
+    patched=ds.map(patch,batched=True,batch_size=10000,input_columns=out_columns,with_indices=True,features=ds.features)
+    # the saved dataset is memory mapped, write the patched copy next to it and swap them
+    tmp_path=f'{output_path.rstrip(os.sep)}.tmp'
+    patched.save_to_disk(tmp_path)
+    del ds,affected,patched
+    shutil.rmtree(output_path)
+    os.replace(tmp_path,output_path)
+
+    index.replace_documents([ids[row] for row in patches],[missing_words for _,missing_words in patches.values()])
+    return len(patches)
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Process dataset for transliteration.')
-    parser.add_argument('--dictionary_path', type=str, required=True, help='Path to the dictionary JSON file.')
+    parser.add_argument('--dictionary_path', type=str, default=None, help='Path to the dictionary JSON or binary (.xdict) file.')
     parser.add_argument('--src_lang', type=str, required=False, help='Source language of the text')
     parser.add_argument('--cache_dir', type=str, default=None,required=True, help='Cache directory for storing temporary files.')
     parser.add_argument('--id_column', type=str, default='doc_id', help='Column to be processed.')
     parser.add_argument('--text_column', type=str, default='translated', help='Column to be processed.')
     parser.add_argument('--other_columns', nargs='*', default=[], help='Columns to be intact with processed columns.')
     parser.add_argument('--file_type', type=str, required=True,choices=['csv','parquet','arrow'])
-    parser.add_argument('--dataset_path', type=str, required=True, help='Glob path for dataset files.')
+    parser.add_argument('--dataset_path', type=str, default=None, help='Glob path for dataset files.')
     parser.add_argument('--missing_log_path', type=str, required=True, help='Name for missing words text file')
     parser.add_argument('--num_proc', type=int, default=4, help='Number of processes to use.')
     parser.add_argument('--batch_size', type=int, default=16, help='Batch size for processing.')
     parser.add_argument('--sample_size', type=int, help='Sample size to select from dataset.')
-    parser.add_argument('--output_path', type=str, required=True, help='Output path for the processed dataset.')
+    parser.add_argument('--output_path', type=str, default=None, help='Output path for the processed dataset.')
+    parser.add_argument('--arrow_batches', action='store_true', help='Read and write batches as Arrow buffers instead of python lists.')
+    parser.add_argument('--dedup_lines', action='store_true', help='Transliterate repeated lines once and reuse their output.')
+    parser.add_argument('--adaptive_batches', action='store_true', help='Size replacement batches by characters, tuned from their measured latency and memory, instead of --batch_size rows.')
+    parser.add_argument('--threads', action='store_true', help='Replace on --num_proc threads sharing one dictionary instead of processes, on free-threaded Python only; processes are used when the GIL is enabled.')
+    parser.add_argument('--read_rows', type=int, default=10000, help='Rows handed to each map call in --adaptive_batches and --threads modes, split there into batches.')
+    parser.add_argument('--max_batch_latency', type=float, default=2.0, help='Seconds a batch may take in --adaptive_batches mode before batches are made smaller.')
+    parser.add_argument('--max_worker_memory_mb', type=int, default=None, help='Resident memory of a worker in --adaptive_batches mode above which batches are made smaller.')
+    parser.add_argument('--line_cache_size', type=int, default=100000, help='Distinct lines cached per worker in --dedup_lines mode.')
+    parser.add_argument('--index_missing_words', action='store_true', help='Also save an SQLite index of missing words to document IDs at <missing_log_path>/<src_lang>.missing_index.sqlite, needed by --since_dictionary.')
+    parser.add_argument('--missing_index_path', type=str, default=None, help='Path of the missing words index, implies --index_missing_words')
+    parser.add_argument('--since_dictionary', action='store_true', help='Only transliterate again the documents of --output_path holding words added to the dictionary since the last run.')
+    parser.add_argument('--jobs_path', type=str, default=None, help='JSON list of jobs with src_lang, dictionary_path, dataset_path and output_path, run on one shared pool of --num_proc workers.')
+    parser.add_argument('--num_shards', type=int, default=None, help='Split the dataset files into this many shards balanced by size and only process --shard_index.')
+    parser.add_argument('--shard_index', type=int, default=None, help='Shard processed by this node, its outputs go to <output_path>/shard-<index>.')
+    parser.add_argument('--shard_manifest', type=str, default=None, help='Shard plan written by sharding.py plan, used instead of planning from --dataset_path.')
+    parser.add_argument('--split_row_groups', action='store_true', help='Shard parquet files by row group instead of by file.')
+    parser.add_argument('--prefetch_depth', type=int, default=0, help='Stream parquet row groups or CSV chunks instead of loading the dataset up front, reading up to this many ahead in a background thread.')
+    parser.add_argument('--max_replacers', type=int, default=2, help='Dictionaries each worker keeps loaded in --jobs_path mode, also the number of languages run at once.')
 
     args = parser.parse_args()
+    if not args.jobs_path and not (args.dictionary_path and (args.dataset_path or args.since_dictionary) and args.output_path and args.src_lang):
+        parser.error('--dictionary_path, --dataset_path, --output_path and --src_lang are required without --jobs_path, --dataset_path is not needed with --since_dictionary')
+    if args.jobs_path and (args.num_shards or args.shard_manifest):
+        parser.error('--num_shards and --shard_manifest shard the files of --dataset_path, they can not be combined with --jobs_path')
+    if (args.num_shards or args.shard_manifest) and args.shard_index is None:
+        parser.error('--shard_index is required with --num_shards or --shard_manifest')
+    if args.since_dictionary and not (args.index_missing_words or args.missing_index_path):
+        parser.error('--since_dictionary needs the index of the previous run, pass --index_missing_words or --missing_index_path')
+    if args.prefetch_depth and args.file_type=='arrow':
+        parser.error('--prefetch_depth streams parquet and csv files only')
+    if args.prefetch_depth and (args.dedup_lines or args.adaptive_batches or args.threads or args.arrow_batches):
+        parser.error('--prefetch_depth replaces on a pool of plain replacers, without --dedup_lines, --adaptive_batches, --threads or --arrow_batches')
+    if args.jobs_path and (args.dedup_lines or args.adaptive_batches or args.threads or args.arrow_batches):
+        parser.error('--jobs_path replaces on a pool of plain replacers, without --dedup_lines, --adaptive_batches, --threads or --arrow_batches')
+    if args.threads and (args.dedup_lines or args.adaptive_batches):
+        parser.error('--threads can not be combined with --dedup_lines or --adaptive_batches, their state is per process')
+
+    # datasets is only imported once the arguments are valid, --help and usage errors stay fast
+    from datasets import disable_caching,Dataset
+    disable_caching()
 
 
     dictionary_path=args.dictionary_path
@@ -46,7 +292,7 @@ if __name__ == '__main__':
     text_column=args.text_column
     columns=args.other_columns
     file_type=args.file_type
-    dataset_paths=glob.glob(args.dataset_path)
+    dataset_paths=glob.glob(args.dataset_path) if args.dataset_path else []
     sample_size=args.sample_size
     batch_size=args.batch_size
     num_proc=args.num_proc
@@ -54,45 +300,122 @@ if __name__ == '__main__':
     output_path=args.output_path
 
     create_dir_if_not_exists(missing_words_log_path)
+    out_columns=['transliterated','missing_words']
+    # name of the missing words files of this run, suffixed by the shard in sharded runs
+    log_name=src_lang
+    row_group_units=None
 
-    columns.extend([id_column,text_column])
-    ds=load_dataset(
-        file_type,
-        data_files=dataset_paths,
-        cache_dir=cache_dir,
-        num_proc=num_proc,
-    ).select_columns(columns)
-    
-    ds=ds.filter(lambda x : x[text_column] not in (None,''),num_proc=num_proc)
+    if args.num_shards or args.shard_manifest:
+        if args.shard_manifest:
+            shards=load_manifest(args.shard_manifest)
+        else:
+            shards=plan_shards(dataset_paths,args.num_shards,file_type,args.split_row_groups)
+        shard=shards[args.shard_index]
+        units=shard['units']
+        if any(unit['row_groups'] is not None for unit in units):
+            row_group_units=units
+        dataset_paths=[unit['path'] for unit in units]
+        output_path=os.path.join(output_path,shard_name(args.shard_index))
+        log_name=f'{src_lang}.{shard_name(args.shard_index)}'
+        print(f'Processing {shard_name(args.shard_index)} of {len(shards)}: {len(units)} units, {numerize(shard["bytes"],3)}B')
 
-    if sample_size:
-        ds = ds['train'].select(range(sample_size))
-    else:
-        ds=ds['train']
-    
-    print(f'{numerize(ds.num_rows)} rows in the dataset with columns {ds.column_names}')
+    if args.jobs_path:
+        with open(args.jobs_path) as file:
+            job_specs=json.load(file)
+        replace_many_languages(job_specs,args,out_columns)
+        raise SystemExit(0)
+
+    index=None
+    if args.missing_index_path or args.index_missing_words:
+        index=MissingWordIndex(args.missing_index_path or os.path.join(missing_words_log_path,f'{log_name}.missing_index.sqlite'))
+
+    if args.since_dictionary:
+        mem_replacer=MemoryWordReplacer(dictionary_path,src_lang=src_lang)
+        count=reprocess_since_dictionary(mem_replacer,index,output_path,id_column,text_column,out_columns,batch_size,num_proc)
+        print(f'Patched {numerize(count,3)} documents in {output_path}')
+        with open(f'{missing_words_log_path}/{log_name}.csv','w',newline='',encoding='utf-8') as file:
+            writer=csv.writer(file)
+            writer.writerow(['missing_words'])
+            writer.writerows([word] for word in index.words())
+        index.close()
+        raise SystemExit(0)
+
+    columns=[*columns,id_column,text_column]
+    if not dataset_paths:
+        # a shard without inputs still leaves an output for the merge step
+        Dataset.from_dict({column:[] for column in [*columns,*out_columns]},features=output_features(columns,out_columns)).save_to_disk(output_path)
+        print(f'No inputs assigned to {output_path}, saved an empty dataset')
+        raise SystemExit(0)
+    if args.prefetch_depth:
+        # streamed as a single job of the shared pool, reading ahead while workers transliterate
+        replace_many_languages([{
+            'src_lang':src_lang,
+            'dictionary_path':dictionary_path,
+            'dataset_paths':dataset_paths,
+            'output_path':output_path,
+            'log_name':log_name,
+            'missing_index_path':args.missing_index_path,
+            'row_group_units':row_group_units,
+            }],args,out_columns)
+        raise SystemExit(0)
+    ds=load_corpus(file_type,dataset_paths,cache_dir,columns,text_column,num_proc,sample_size,row_group_units)
+
+    line_cache=None
+    if args.dedup_lines:
+        stats_dir=os.path.join(missing_words_log_path,f'{log_name}.dedup_stats')
+        shutil.rmtree(stats_dir,ignore_errors=True)
+        line_cache=LineCache(args.line_cache_size,stats_dir)
 
     # Intialize dictionary for the flashtext
-    mem_replacer=MemoryWordReplacer(dictionary_path,src_lang=src_lang)
+    mem_replacer=MemoryWordReplacer(dictionary_path,src_lang=src_lang,line_cache=line_cache)
 
-    out_columns=['transliterated','missing_words']
+    out_features=output_features(columns,out_columns)
 
-    out_features=Features({
-        column:Value("string") for column in columns } | {
-        out_columns[0]: Value("string"),
-        out_columns[1]: Sequence(Value("string"))
-        })
+    replacer=mem_replacer
+    if args.adaptive_batches:
+        stats_dir=os.path.join(missing_words_log_path,f'{log_name}.batch_stats')
+        shutil.rmtree(stats_dir,ignore_errors=True)
+        replacer=AdaptiveBatcher(
+            mem_replacer,
+            max_latency=args.max_batch_latency,
+            max_memory=args.max_worker_memory_mb*2**20 if args.max_worker_memory_mb else None,
+            stats_dir=stats_dir
+            )
+        batch_size=args.read_rows
 
-    ds=ds.map(
-        lambda z:dict(zip(out_columns,mem_replacer.replace_batches(z[text_column]))),
-        batched=True,
-        batch_size=batch_size,
-        num_proc=num_proc,
-        features=out_features
-    )
-    df=ds.to_pandas()['missing_words'].explode().drop_duplicates()
-    df.to_csv(f'{missing_words_log_path}/{src_lang}.csv',index=False)
-    if ds.num_rows//2>num_proc and num_proc>=40:
-        ds.save_to_disk(output_path,num_proc=40)
+    map_num_proc=num_proc
+    if args.threads:
+        if gil_enabled():
+            print(f'The GIL is enabled in this interpreter, replacing on {num_proc} processes instead of threads')
+        else:
+            replacer=ThreadedReplacer(mem_replacer,num_proc,batch_size)
+            batch_size=args.read_rows
+            map_num_proc=None
+            print(f'Replacing on {num_proc} threads sharing one dictionary')
+
+    if args.arrow_batches:
+        from arrow_batch import replace_arrow_batch
+        ds=ds.with_format('arrow').map(
+            partial(replace_arrow_batch,replacer,text_column=text_column,out_columns=out_columns),
+            batched=True,
+            batch_size=batch_size,
+            num_proc=map_num_proc,
+            features=out_features
+        ).with_format(None)
     else:
-        ds.save_to_disk(output_path)
\ No newline at end of file
+        ds=ds.map(
+            lambda z:dict(zip(out_columns,replacer.replace_batches(z[text_column]))),
+            batched=True,
+            batch_size=batch_size,
+            num_proc=map_num_proc,
+            features=out_features
+        )
+    if isinstance(replacer,AdaptiveBatcher):
+        stats=merge_batch_stats(replacer.stats_dir)
+        print(f'{numerize(stats["rows"],3)} rows in {numerize(stats["batches"],3)} adaptive batches at {numerize(stats["throughput"],3)} chars/s, '
+              f'settled budgets {stats["budgets"]} chars across {stats["workers"]} workers ({stats["backoffs"]} backoffs, peak {numerize(stats["peak_rss"],3)}B resident)')
+    if line_cache is not None:
+        stats=merge_line_stats(line_cache.stats_dir)
+        print(f'Dedup ratio {stats["dedup_ratio"]:.2%}: {numerize(stats["hits"],3)} of {numerize(stats["lines"],3)} lines '
+              f'served from the cache across {stats["workers"]} workers ({numerize(stats["evictions"],3)} evictions)')
+    save_outputs(ds,output_path,missing_words_log_path,log_name,index,id_column,num_proc)
@@ -0,0 +1,102 @@
+import os
+import sqlite3
+import threading
+
+
+class MissingWordIndex:
+    """
+    Persistent SQLite inverted index from words missing from the dictionary to the documents
+    holding them.
+
+    It is built from the `missing_words` column of a run, so once the dictionary grows only the
+    documents containing newly added words have to be transliterated again.
+    """
+    # keeps the number of bound parameters below the SQLite limit
+    lookup_chunk_size=500
+
+    def __init__(self, path:str)->None:
+        directory=os.path.dirname(path)
+        if directory:
+            os.makedirs(directory,exist_ok=True)
+        self.path=path
+        self.lock=threading.Lock()
+        self.connection=sqlite3.connect(path,check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS missing_words (
+                word TEXT NOT NULL,
+                doc_id NOT NULL,
+                PRIMARY KEY (word, doc_id)
+            ) WITHOUT ROWID
+        ''')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS missing_words_doc_id ON missing_words (doc_id)')
+        self.connection.commit()
+
+    def clear(self)->None:
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM missing_words')
+
+    def _insert(self, doc_ids:list, missing_words:list)->None:
+        self.connection.executemany(
+            'INSERT OR IGNORE INTO missing_words VALUES (?, ?)',
+            (
+                (word,doc_id)
+                for doc_id,words in zip(doc_ids,missing_words)
+                for word in words or [] if word
+            )
+        )
+
+    def add_documents(self, doc_ids:list, missing_words:list)->None:
+        """
+        Index the missing words of many documents in a single transaction.
+
+        Args:
+            doc_ids (list): Document IDs.
+            missing_words (list of list of str): Missing words of each document.
+        """
+        with self.lock, self.connection:
+            self._insert(doc_ids,missing_words)
+
+    def replace_documents(self, doc_ids:list, missing_words:list)->None:
+        """
+        Replace the indexed missing words of documents that were transliterated again.
+        """
+        with self.lock, self.connection:
+            for i in range(0,len(doc_ids),self.lookup_chunk_size):
+                chunk=doc_ids[i:i+self.lookup_chunk_size]
+                self.connection.execute(
+                    f'DELETE FROM missing_words WHERE doc_id IN ({",".join("?"*len(chunk))})',
+                    chunk
+                )
+            self._insert(doc_ids,missing_words)
+
+    def words(self)->list:
+        """
+        Distinct words missing from the dictionary in any document.
+        """
+        with self.lock:
+            return [row[0] for row in self.connection.execute('SELECT DISTINCT word FROM missing_words')]
+
+    def documents_for(self, words:list)->set:
+        """
+        IDs of the documents holding any of `words`.
+        """
+        doc_ids=set()
+        for i in range(0,len(words),self.lookup_chunk_size):
+            chunk=words[i:i+self.lookup_chunk_size]
+            with self.lock:
+                rows=self.connection.execute(
+                    f'SELECT DISTINCT doc_id FROM missing_words WHERE word IN ({",".join("?"*len(chunk))})',
+                    chunk
+                ).fetchall()
+            doc_ids.update(row[0] for row in rows)
+        return doc_ids
+
+    def __len__(self)->int:
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(DISTINCT doc_id) FROM missing_words').fetchone()[0]
+
+    def close(self)->None:
+        with self.lock:
+            self.connection.close()
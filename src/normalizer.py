@@ -1,5 +1,5 @@
-from indicnlp.normalize.indic_normalize import IndicNormalizerFactory
 import re
+from functools import lru_cache
 
 # IndicTrans lang code
 src_langs=["hin_Deva", "tam_Taml", "asm_Beng", "ben_Beng", "kan_Knda", "mar_Deva", "mal_Mlym", "npi_Deva", "ory_Orya", "pan_Guru", "san_Deva", "tel_Telu", "urd_Arab", "guj_Gujr"]
@@ -25,6 +25,16 @@ indic_script_patterns={
 
 thandaa_pattern = re.compile(r'[।|॥]')
 
+@lru_cache(maxsize=None)
+def get_normalizer(src_lang:str):
+    """
+    Return the indicnlp normalizer of a language, created once per process.
+
+    indicnlp is imported on first use so importing this module stays cheap.
+    """
+    from indicnlp.normalize.indic_normalize import IndicNormalizerFactory
+    return IndicNormalizerFactory().get_normalizer(language=mapping_dict[src_lang])
+
 def normalize(src_lang:str ,text:str )-> str:
     """
     Normalize text in specified South Asian language script.
@@ -52,8 +62,7 @@ def normalize(src_lang:str ,text:str )-> str:
         text=text.replace('۔', '.').replace('؟', '?')
         return text
     
-    Normalizer=IndicNormalizerFactory().get_normalizer(language=mapping_dict[src_lang])
-    return Normalizer.normalize(text)
+    return get_normalizer(src_lang).normalize(text)
     
 if __name__=='__main__':
 
@@ -0,0 +1,148 @@
+import time
+import queue
+import threading
+
+_end_of_stream=object()
+
+
+class Prefetcher:
+    """
+    Iterates over `items` in a background thread, keeping up to `depth` items ready.
+
+    The next items are read and decoded while the consumer works on the current one, so disk
+    and network stalls are hidden as long as reading is not slower than processing. An
+    exception raised while producing is raised to the consumer after the items before it.
+    The time the consumer spent waiting for input is kept in `stall_seconds`.
+    """
+    def __init__(self, items, depth:int=2)->None:
+        """
+        Args:
+            items (iterable): Items to produce, iterated in the background thread.
+            depth (int): Items produced ahead of the consumer at most.
+        """
+        self.items=items
+        self.queue=queue.Queue(maxsize=max(1,depth))
+        self.stopped=threading.Event()
+        self.stall_seconds=0.0
+        self.thread=threading.Thread(target=self.produce,daemon=True)
+        self.thread.start()
+
+    def put(self, entry:tuple)->bool:
+        # wake up regularly so a closed prefetcher does not leave the thread blocked on a full queue
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(entry,timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce(self)->None:
+        try:
+            for item in self.items:
+                if not self.put((item,None)):
+                    return
+            self.put((None,_end_of_stream))
+        except BaseException as e:
+            self.put((None,e))
+
+    def __iter__(self):
+        while True:
+            start=time.perf_counter()
+            item,error=self.queue.get()
+            self.stall_seconds+=time.perf_counter()-start
+            if error is _end_of_stream:
+                return
+            if error is not None:
+                raise error
+            yield item
+
+    def close(self)->None:
+        self.stopped.set()
+        self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc)->None:
+        self.close()
+
+
+def iter_parquet_tables(units:list, columns:list):
+    """
+    Read parquet files one row group at a time.
+
+    Args:
+        units (list of dict): Files as `path` and `row_groups`, None for all row groups.
+        columns (list of str): Columns to read.
+    """
+    import pyarrow.parquet as pq
+    for unit in units:
+        file=pq.ParquetFile(unit['path'])
+        row_groups=unit['row_groups'] if unit['row_groups'] is not None else range(file.num_row_groups)
+        for i in row_groups:
+            yield file.read_row_group(i,columns=columns)
+
+
+def iter_csv_tables(paths:list, columns:list, block_size:int=1<<24):
+    """
+    Read CSV files in blocks of about `block_size` bytes, every column as strings.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pv
+    for path in paths:
+        reader=pv.open_csv(
+            path,
+            read_options=pv.ReadOptions(block_size=block_size),
+            convert_options=pv.ConvertOptions(include_columns=columns,column_types={column:pa.string() for column in columns})
+            )
+        for batch in reader:
+            yield pa.Table.from_batches([batch])
+
+
+def read_tables(file_type:str, paths:list, columns:list, text_column:str, units:list=None, block_size:int=1<<24):
+    """
+    Read the columns of a corpus as a stream of Arrow tables of string columns, dropping rows
+    without text like `main.load_corpus`.
+
+    Args:
+        file_type (str): 'parquet' or 'csv'.
+        paths (list of str): Input files.
+        columns (list of str): Columns to read.
+        text_column (str): Column holding the text.
+        units (list of dict): Parquet row groups of a shard plan, read instead of whole `paths`.
+        block_size (int): Bytes per CSV chunk.
+
+    Raises:
+        ValueError: If the file type can not be streamed.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    if file_type=='parquet':
+        tables=iter_parquet_tables(units or [{'path':path,'row_groups':None} for path in sorted(paths)],columns)
+    elif file_type=='csv':
+        tables=iter_csv_tables(sorted(paths),columns,block_size)
+    else:
+        raise ValueError(f'Only parquet and csv files can be prefetched, got {file_type}')
+    schema=pa.schema([(column,pa.string()) for column in columns])
+    for table in tables:
+        table=table.select(columns).cast(schema)
+        text=table[text_column]
+        yield table.filter(pc.and_(pc.is_valid(text),pc.not_equal(text,'')))
+
+
+def iter_batches(tables, batch_size:int, sample_size:int=None):
+    """
+    Slice a stream of tables into batches of `batch_size` rows as column dictionaries.
+
+    A batch does not span two tables. At most `sample_size` rows are returned if given.
+    """
+    rows=0
+    for table in tables:
+        if sample_size is not None:
+            table=table.slice(0,sample_size-rows)
+        for start in range(0,table.num_rows,batch_size):
+            yield table.slice(start,batch_size).to_pydict()
+        rows+=table.num_rows
+        if sample_size is not None and rows>=sample_size:
+            return
@@ -0,0 +1,169 @@
+import time
+import multiprocessing
+from collections import OrderedDict,deque
+from concurrent.futures import ProcessPoolExecutor,FIRST_COMPLETED,wait
+from numerize.numerize import numerize
+from MemoryWordReplacer import MemoryWordReplacer
+
+# Replacers of the current process, least recently used first
+_replacers=OrderedDict()
+_max_replacers=2
+
+
+def init_replacer_worker(max_replacers:int)->None:
+    global _max_replacers
+    _max_replacers=max_replacers
+
+
+def get_replacer(src_lang:str, dictionary_path:str)->MemoryWordReplacer:
+    """
+    Return the replacer of a language, loading its dictionary on first use.
+
+    At most `max_replacers` replacers are kept per process, the least recently used one is
+    dropped to make room for a new language.
+    """
+    key=(src_lang,dictionary_path)
+    if key in _replacers:
+        _replacers.move_to_end(key)
+        return _replacers[key]
+    while len(_replacers)>=_max_replacers:
+        _replacers.popitem(last=False)
+    _replacers[key]=MemoryWordReplacer(dictionary_path,src_lang=src_lang)
+    return _replacers[key]
+
+
+def replace_batch(src_lang:str, dictionary_path:str, texts:list)->tuple[list,list]:
+    return get_replacer(src_lang,dictionary_path).replace_batches(texts)
+
+
+def create_replacer_pool(num_workers:int, max_replacers:int)->ProcessPoolExecutor:
+    """
+    Create the pool shared by every language, workers load replacers lazily.
+
+    Args:
+        num_workers (int): Number of worker processes.
+        max_replacers (int): Replacers each worker keeps loaded.
+
+    Returns:
+        ProcessPoolExecutor: The replacement pool.
+    """
+    return ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_replacer_worker,
+        initargs=(max_replacers,)
+        )
+
+
+class Job:
+    """
+    Replacement of one corpus with the dictionary of its language.
+
+    Batches come from `batches` and their outputs are passed to `on_result` in input order,
+    whatever the order in which the pool finishes them.
+    """
+    def __init__(self, src_lang:str, dictionary_path:str, batches, text_column:str, on_result)->None:
+        """
+        Args:
+            src_lang (str): Language of the corpus (e.g., hin_Deva).
+            dictionary_path (str): Dictionary of the language.
+            batches (iterable of dict): Batches of the corpus as column dictionaries.
+            text_column (str): Column holding the text.
+            on_result (callable): Called with each batch and its (transliterated, missing_words).
+        """
+        self.src_lang=src_lang
+        self.dictionary_path=dictionary_path
+        self.batches=iter(batches)
+        self.text_column=text_column
+        self.on_result=on_result
+        self.submitted=self.written=self.rows=0
+        self.finished={}
+        self.exhausted=False
+        self.start=None
+
+    def next_batch(self):
+        batch=next(self.batches,None)
+        if batch is None:
+            self.exhausted=True
+            return None
+        index=self.submitted
+        self.submitted+=1
+        return index,batch
+
+    def complete(self, index:int, batch:dict, result:tuple)->None:
+        self.finished[index]=(batch,result)
+        while self.written in self.finished:
+            batch,result=self.finished.pop(self.written)
+            self.on_result(batch,result)
+            self.rows+=len(result[0])
+            self.written+=1
+
+    @property
+    def done(self)->bool:
+        return self.exhausted and self.written==self.submitted
+
+
+def run_jobs(jobs:list, pool:ProcessPoolExecutor, max_active_languages:int=2, max_in_flight:int=None, on_done=None)->None:
+    """
+    Schedule the batches of many jobs onto one pool.
+
+    Up to `max_active_languages` jobs are active at once and their batches are submitted in turn,
+    so small languages do not wait for big ones and the pool stays busy until the last batch.
+    When a job finishes the next one takes its place. Keeping the active languages within the
+    replacers each worker holds avoids reloading dictionaries.
+
+    Args:
+        jobs (list of Job): Jobs to run, in order of activation.
+        pool (ProcessPoolExecutor): Pool running `replace_batch`.
+        max_active_languages (int): Jobs with batches in flight at a time.
+        max_in_flight (int): Batches submitted and not yet collected, twice the workers of the pool by default.
+        on_done (callable): Called with every job once its last batch is written.
+    """
+    max_in_flight=max_in_flight or 2*pool._max_workers
+    waiting=deque(jobs)
+    active=deque()
+    in_flight={}
+
+    def activate():
+        while waiting and len(active)<max_active_languages:
+            job=waiting.popleft()
+            job.start=time.perf_counter()
+            print(f'Started {job.src_lang} with {job.dictionary_path}')
+            active.append(job)
+
+    def finish(job):
+        active.remove(job)
+        seconds=time.perf_counter()-job.start
+        print(f'Finished {job.src_lang}: {numerize(job.rows,3)} rows in {seconds:.1f}s')
+        if on_done:
+            on_done(job)
+
+    activate()
+    while active or in_flight:
+        # round robin over the active jobs until the in flight budget is used or no job has
+        # batches left to submit
+        idle=0
+        while active and len(in_flight)<max_in_flight and idle<len(active):
+            job=active[0]
+            active.rotate(-1)
+            item=None if job.exhausted else job.next_batch()
+            if item is None:
+                idle+=1
+                if job.done:
+                    finish(job)
+                    activate()
+                    idle=0
+                continue
+            idle=0
+            index,batch=item
+            future=pool.submit(replace_batch,job.src_lang,job.dictionary_path,batch[job.text_column])
+            in_flight[future]=(job,index,batch)
+        if not in_flight:
+            continue
+        completed,_=wait(in_flight,return_when=FIRST_COMPLETED)
+        for future in completed:
+            job,index,batch=in_flight.pop(future)
+            job.complete(index,batch,future.result())
+            if job.done and job in active:
+                finish(job)
+                activate()
@@ -0,0 +1,314 @@
+import os
+import json
+import time
+import socket
+import argparse
+import threading
+import socketserver
+import http.client
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler,ThreadingHTTPServer
+from MemoryWordReplacer import MemoryWordReplacer
+
+
+class Request:
+    """
+    Lines of one client request waiting for their batch.
+    """
+    def __init__(self, lines:list)->None:
+        self.lines=lines
+        self.received=time.perf_counter()
+        self.done=threading.Event()
+        self.result=None
+        self.error=None
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests of one language into micro-batches.
+
+    A batch is sent to the replacer once it holds `max_batch_size` lines or once its oldest
+    request waited `max_delay` seconds, so small requests share one `replace_batches` call
+    without waiting longer than the deadline.
+    """
+    def __init__(self, replacer:MemoryWordReplacer, max_batch_size:int=64, max_delay:float=0.01, window:int=10000)->None:
+        """
+        Args:
+            replacer (MemoryWordReplacer): Warm replacer of the language.
+            max_batch_size (int): Lines per batch before it is sent without waiting.
+            max_delay (float): Seconds the oldest request of a batch may wait for others.
+            window (int): Number of recent requests the latency percentiles are computed on.
+        """
+        self.replacer=replacer
+        self.max_batch_size=max_batch_size
+        self.max_delay=max_delay
+        self.pending=deque()
+        self.condition=threading.Condition()
+        self.latencies=deque(maxlen=window)
+        self.batch_sizes=deque(maxlen=window)
+        self.requests=self.lines=self.batches=0
+        self.running=True
+        self.thread=threading.Thread(target=self.run,daemon=True)
+        self.thread.start()
+
+    def submit(self, lines:list, timeout:float=None)->tuple[list,list]:
+        """
+        Transliterate lines along with the requests of other clients.
+
+        Returns:
+            tuple: Transliterated lines and the missing words of each line.
+
+        Raises:
+            TimeoutError: If the batch did not finish within `timeout` seconds.
+        """
+        request=Request(lines)
+        with self.condition:
+            self.pending.append(request)
+            self.condition.notify()
+        if not request.done.wait(timeout):
+            raise TimeoutError(f'Request of {len(lines)} lines did not finish within {timeout}s')
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def pending_lines(self)->int:
+        return sum(len(request.lines) for request in self.pending)
+
+    def next_batch(self)->list:
+        with self.condition:
+            while self.running and not self.pending:
+                self.condition.wait()
+            if not self.running:
+                return []
+            deadline=self.pending[0].received+self.max_delay
+            while self.pending_lines()<self.max_batch_size:
+                remaining=deadline-time.perf_counter()
+                if remaining<=0:
+                    break
+                self.condition.wait(remaining)
+            batch,size=[],0
+            while self.pending and (not batch or size+len(self.pending[0].lines)<=self.max_batch_size):
+                request=self.pending.popleft()
+                batch.append(request)
+                size+=len(request.lines)
+            return batch
+
+    def replace(self, batch:list)->None:
+        """
+        Transliterate the requests of a batch together and hand each its share of the output.
+        """
+        lines=[line for request in batch for line in request.lines]
+        transliterated,missing_words=self.replacer.replace_batches(lines)
+        if len(transliterated)!=len(lines):
+            transliterated,missing_words=self.replacer.replace_batches(lines,use_placeholder=False)
+        start=0
+        now=time.perf_counter()
+        for request in batch:
+            end=start+len(request.lines)
+            request.result=(transliterated[start:end],missing_words[start:end])
+            start=end
+            self.latencies.append(now-request.received)
+            request.done.set()
+        self.requests+=len(batch)
+        self.lines+=len(lines)
+        self.batches+=1
+        self.batch_sizes.append(len(lines))
+
+    def run(self)->None:
+        while self.running:
+            batch=self.next_batch()
+            if not batch:
+                continue
+            try:
+                self.replace(batch)
+            except Exception as e:
+                if len(batch)==1:
+                    batch[0].error=e
+                    batch[0].done.set()
+                    continue
+                # replace the requests one by one, so a failing request only fails its own client
+                for request in batch:
+                    try:
+                        self.replace([request])
+                    except Exception as e:
+                        request.error=e
+                        request.done.set()
+
+    def stats(self)->dict:
+        """
+        Queue depth, throughput counters and latency percentiles in milliseconds.
+        """
+        with self.condition:
+            queue_requests=len(self.pending)
+            queue_lines=self.pending_lines()
+        latencies=sorted(self.latencies)
+        percentile=lambda q:latencies[min(len(latencies)-1,int(q*len(latencies)))]*1000 if latencies else None
+        return {
+            'queue_requests':queue_requests,
+            'queue_lines':queue_lines,
+            'requests':self.requests,
+            'lines':self.lines,
+            'batches':self.batches,
+            'mean_batch_lines':sum(self.batch_sizes)/len(self.batch_sizes) if self.batch_sizes else None,
+            'latency_ms':{'p50':percentile(0.5),'p90':percentile(0.9),'p99':percentile(0.99)},
+        }
+
+    def close(self)->None:
+        with self.condition:
+            self.running=False
+            self.condition.notify_all()
+        self.thread.join()
+
+
+class TransliterationHandler(BaseHTTPRequestHandler):
+    """
+    POST /transliterate with {"src_lang": ..., "lines": [...]}, GET /stats and GET /health.
+    """
+    def send_json(self, status:int, payload:dict)->None:
+        body=json.dumps(payload,ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type','application/json; charset=utf-8')
+        self.send_header('Content-Length',str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self)->None:
+        if self.path=='/health':
+            self.send_json(200,{'status':'ok','languages':sorted(self.server.batchers)})
+        elif self.path=='/stats':
+            self.send_json(200,{lang:batcher.stats() for lang,batcher in self.server.batchers.items()})
+        else:
+            self.send_json(404,{'error':f'Unknown path {self.path}'})
+
+    def do_POST(self)->None:
+        if self.path!='/transliterate':
+            self.send_json(404,{'error':f'Unknown path {self.path}'})
+            return
+        try:
+            request=json.loads(self.rfile.read(int(self.headers.get('Content-Length',0))))
+            src_lang,lines=request['src_lang'],request['lines']
+        except (ValueError,KeyError,TypeError) as e:
+            self.send_json(400,{'error':f'Expected a JSON object with src_lang and lines: {e}'})
+            return
+        if not isinstance(lines,list) or not all(isinstance(line,str) for line in lines):
+            self.send_json(400,{'error':'lines must be a list of strings'})
+            return
+        batcher=self.server.batchers.get(src_lang)
+        if batcher is None:
+            self.send_json(400,{'error':f'Language {src_lang} is not served, available: {sorted(self.server.batchers)}'})
+            return
+        try:
+            transliterated,missing_words=batcher.submit(lines,self.server.request_timeout)
+        except Exception as e:
+            self.send_json(500,{'error':str(e)})
+            return
+        self.send_json(200,{'transliterated':transliterated,'missing_words':missing_words})
+
+    def address_string(self)->str:
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args)->None:
+        # request logs would dominate the cost of small requests
+        pass
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn,socketserver.UnixStreamServer):
+    daemon_threads=True
+
+    def get_request(self):
+        connection,_=super().get_request()
+        return connection,('unix',0)
+
+
+def create_server(batchers:dict, host:str='127.0.0.1', port:int=8080, unix_socket:str=None, request_timeout:float=60.0):
+    """
+    Create the HTTP server of the service on localhost or on a Unix socket.
+
+    Args:
+        batchers (dict): Mapping of each served language to its MicroBatcher.
+        host (str): Address to bind, localhost by default.
+        port (int): Port to bind, 0 picks a free one.
+        unix_socket (str): Path of a Unix socket to serve on instead of TCP.
+        request_timeout (float): Seconds a request may wait for its batch.
+
+    Returns:
+        The server, not yet serving.
+    """
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server=ThreadingUnixHTTPServer(unix_socket,TransliterationHandler)
+    else:
+        server=ThreadingHTTPServer((host,port),TransliterationHandler)
+        server.daemon_threads=True
+    server.batchers=batchers
+    server.request_timeout=request_timeout
+    return server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path:str, timeout:float=None)->None:
+        super().__init__('localhost',timeout=timeout)
+        self.unix_socket=path
+
+    def connect(self)->None:
+        self.sock=socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_socket)
+
+
+def transliterate_lines(lines:list, src_lang:str, url:str='http://127.0.0.1:8080', unix_socket:str=None, timeout:float=60.0)->dict:
+    """
+    Send lines to a running service.
+
+    Returns:
+        dict: `transliterated` lines and `missing_words` of each line.
+    """
+    body=json.dumps({'src_lang':src_lang,'lines':lines},ensure_ascii=False).encode('utf-8')
+    headers={'Content-Type':'application/json; charset=utf-8'}
+    if unix_socket:
+        connection=_UnixHTTPConnection(unix_socket,timeout)
+        try:
+            connection.request('POST','/transliterate',body,headers)
+            response=connection.getresponse()
+            payload=json.loads(response.read())
+        finally:
+            connection.close()
+        if response.status!=200:
+            raise RuntimeError(payload.get('error'))
+        return payload
+    request=urllib.request.Request(f'{url}/transliterate',data=body,headers=headers)
+    with urllib.request.urlopen(request,timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='Serve dictionary transliteration from warm replacers with request micro-batching.')
+    parser.add_argument('--languages', nargs='+', required=True, help='Served languages as <src_lang>=<dictionary_path> (e.g., hin_Deva=dicts/hin_Deva.json)')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Address to bind')
+    parser.add_argument('--port', type=int, default=8080, help='Port to bind')
+    parser.add_argument('--unix_socket', type=str, default=None, help='Serve on this Unix socket instead of TCP')
+    parser.add_argument('--max_batch_size', type=int, default=64, help='Lines per micro-batch')
+    parser.add_argument('--max_delay_ms', type=float, default=10, help='Milliseconds a request may wait for others to join its batch')
+    parser.add_argument('--request_timeout', type=float, default=60, help='Seconds a request may wait for its result')
+    args = parser.parse_args()
+
+    batchers={}
+    for language in args.languages:
+        src_lang,dictionary_path=language.split('=',1)
+        start=time.perf_counter()
+        replacer=MemoryWordReplacer(dictionary_path,src_lang=src_lang)
+        batchers[src_lang]=MicroBatcher(replacer,args.max_batch_size,args.max_delay_ms/1000)
+        print(f'Loaded {src_lang} from {dictionary_path} in {time.perf_counter()-start:.1f}s')
+
+    server=create_server(batchers,args.host,args.port,args.unix_socket,args.request_timeout)
+    print(f'Serving {sorted(batchers)} on {args.unix_socket or f"http://{args.host}:{server.server_address[1]}"}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for batcher in batchers.values():
+            batcher.close()
@@ -0,0 +1,209 @@
+import os
+import csv
+import json
+import heapq
+import sqlite3
+import argparse
+from glob import glob
+from itertools import groupby
+from datetime import datetime,timezone
+from numerize.numerize import numerize
+from dict_io import external_sort
+
+MANIFEST_VERSION=1
+
+
+def shard_name(shard_index:int)->str:
+    return f'shard-{shard_index:05d}'
+
+
+def input_units(dataset_paths:list, file_type:str, split_row_groups:bool=False)->list:
+    """
+    Split the inputs into the units assigned to shards, with their size in bytes.
+
+    Args:
+        dataset_paths (list of str): Input files.
+        file_type (str): Dataset file type.
+        split_row_groups (bool): Assign the row groups of parquet files separately, so a few
+            big files can still be spread over many shards.
+
+    Returns:
+        list of dict: Units with `path`, `row_groups` (None for whole files) and `bytes`.
+    """
+    units=[]
+    for path in sorted(set(dataset_paths)):
+        if split_row_groups and file_type=='parquet':
+            import pyarrow.parquet as pq
+            metadata=pq.ParquetFile(path).metadata
+            for i in range(metadata.num_row_groups):
+                units.append({'path':path,'row_groups':[i],'bytes':metadata.row_group(i).total_byte_size})
+        else:
+            units.append({'path':path,'row_groups':None,'bytes':os.path.getsize(path)})
+    return units
+
+
+def plan_shards(dataset_paths:list, num_shards:int, file_type:str, split_row_groups:bool=False)->list:
+    """
+    Assign the inputs to shards, balanced by size.
+
+    Units are taken from largest to smallest and each goes to the least loaded shard, ties
+    broken by path and shard index. The plan only depends on the input paths and sizes, so
+    every node computes the same one without any coordination.
+
+    Args:
+        dataset_paths (list of str): Input files.
+        num_shards (int): Number of shards.
+        file_type (str): Dataset file type.
+        split_row_groups (bool): Assign parquet row groups instead of whole files.
+
+    Returns:
+        list of dict: Shards with their `index`, total `bytes` and `units`.
+    """
+    units=sorted(
+        input_units(dataset_paths,file_type,split_row_groups),
+        key=lambda unit:(-unit['bytes'],unit['path'],unit['row_groups'] or [])
+        )
+    shards=[{'index':i,'bytes':0,'units':[]} for i in range(num_shards)]
+    loads=[(0,i) for i in range(num_shards)]
+    for unit in units:
+        load,i=heapq.heappop(loads)
+        shards[i]['units'].append(unit)
+        shards[i]['bytes']+=unit['bytes']
+        heapq.heappush(loads,(load+unit['bytes'],i))
+    for shard in shards:
+        shard['units'].sort(key=lambda unit:(unit['path'],unit['row_groups'] or []))
+    return shards
+
+
+def write_manifest(shards:list, manifest_path:str, file_type:str)->None:
+    directory=os.path.dirname(manifest_path)
+    if directory:
+        os.makedirs(directory,exist_ok=True)
+    manifest={
+        'version':MANIFEST_VERSION,
+        'created':datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'file_type':file_type,
+        'num_shards':len(shards),
+        'shards':shards,
+    }
+    with open(f'{manifest_path}.tmp','w') as file:
+        json.dump(manifest,file,indent=4)
+    os.replace(f'{manifest_path}.tmp',manifest_path)
+
+
+def load_manifest(manifest_path:str)->list:
+    with open(manifest_path) as file:
+        manifest=json.load(file)
+    if manifest.get('version')!=MANIFEST_VERSION:
+        raise ValueError(f'{manifest_path} has manifest version {manifest.get("version")}, expected {MANIFEST_VERSION}')
+    return manifest['shards']
+
+
+def read_row_groups(units:list, columns:list):
+    """
+    Read the row groups of a shard into a dataset, in path and row group order.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from datasets import Dataset
+    tables=[]
+    for path,path_units in groupby(units,key=lambda unit:unit['path']):
+        row_groups=sorted(i for unit in path_units for i in unit['row_groups'])
+        tables.append(pq.ParquetFile(path).read_row_groups(row_groups,columns=columns))
+    return Dataset(pa.concat_tables(tables))
+
+
+def merge_missing_words(csv_paths:list, output_path:str)->int:
+    """
+    Union the missing words CSVs of all shards into one CSV of distinct words.
+    """
+    def words():
+        for path in csv_paths:
+            with open(path,newline='',encoding='utf-8') as file:
+                reader=csv.reader(file)
+                next(reader,None)
+                for row in reader:
+                    if row and row[0]:
+                        yield row[0]
+
+    count=0
+    with open(output_path,'w',newline='',encoding='utf-8') as file:
+        writer=csv.writer(file)
+        writer.writerow(['missing_words'])
+        for word,_ in groupby(external_sort(words(),tmp_dir=os.path.dirname(output_path) or None)):
+            writer.writerow([word])
+            count+=1
+    return count
+
+
+def merge_missing_indexes(index_paths:list, output_path:str)->None:
+    """
+    Copy the missing word indexes of all shards into one index.
+    """
+    from missing_index import MissingWordIndex
+    MissingWordIndex(output_path).close()
+    connection=sqlite3.connect(output_path)
+    for path in index_paths:
+        connection.execute('ATTACH DATABASE ? AS shard',(path,))
+        with connection:
+            connection.execute('INSERT OR IGNORE INTO missing_words SELECT word, doc_id FROM shard.missing_words')
+        connection.execute('DETACH DATABASE shard')
+    connection.close()
+
+
+def merge_shards(output_path:str, missing_log_path:str, src_lang:str, num_shards:int, merged_output_path:str)->None:
+    """
+    Merge the per shard outputs of `main.py` once every node is done.
+
+    Shard datasets are concatenated in shard order into `merged_output_path`, and the missing
+    words CSVs and indexes of the shards into `<missing_log_path>/<src_lang>.csv` and its index.
+
+    Raises:
+        FileNotFoundError: If the output of a shard is missing.
+    """
+    from datasets import load_from_disk,concatenate_datasets
+    names=[shard_name(i) for i in range(num_shards)]
+    missing=[name for name in names if not os.path.isdir(os.path.join(output_path,name))]
+    if missing:
+        raise FileNotFoundError(f'Shards {missing} of {output_path} are not done yet')
+
+    ds=concatenate_datasets([load_from_disk(os.path.join(output_path,name)) for name in names])
+    ds.save_to_disk(merged_output_path)
+    print(f'Merged {numerize(ds.num_rows,3)} rows of {num_shards} shards into {merged_output_path}')
+
+    csv_paths=[os.path.join(missing_log_path,f'{src_lang}.{name}.csv') for name in names]
+    count=merge_missing_words([path for path in csv_paths if os.path.exists(path)],os.path.join(missing_log_path,f'{src_lang}.csv'))
+    print(f'{numerize(count,3)} distinct missing words saved to {os.path.join(missing_log_path,f"{src_lang}.csv")}')
+
+    # shards only have an index when main.py ran with --index_missing_words
+    index_paths=[os.path.join(missing_log_path,f'{src_lang}.{name}.missing_index.sqlite') for name in names]
+    index_paths=[path for path in index_paths if os.path.exists(path)]
+    if index_paths:
+        merge_missing_indexes(index_paths,os.path.join(missing_log_path,f'{src_lang}.missing_index.sqlite'))
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='Plan the shards of a multi-node run and merge their outputs.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    plan = subparsers.add_parser('plan', help='Write a manifest assigning the inputs to shards')
+    plan.add_argument('--dataset_path', type=str, required=True, help='Glob path for dataset files')
+    plan.add_argument('--file_type', type=str, required=True, choices=['csv','parquet','arrow'])
+    plan.add_argument('--num_shards', type=int, required=True, help='Number of nodes')
+    plan.add_argument('--manifest_path', type=str, required=True, help='Path of the shard manifest')
+    plan.add_argument('--split_row_groups', action='store_true', help='Assign parquet row groups instead of whole files')
+    merge = subparsers.add_parser('merge', help='Merge the outputs of every shard')
+    merge.add_argument('--output_path', type=str, required=True, help='--output_path given to main.py on every node')
+    merge.add_argument('--missing_log_path', type=str, required=True, help='--missing_log_path given to main.py on every node')
+    merge.add_argument('--src_lang', type=str, required=True, help='Source language of the text')
+    merge.add_argument('--num_shards', type=int, required=True, help='Number of shards')
+    merge.add_argument('--merged_output_path', type=str, required=True, help='Path of the merged dataset')
+    args = parser.parse_args()
+
+    if args.command=='plan':
+        shards=plan_shards(glob(args.dataset_path),args.num_shards,args.file_type,args.split_row_groups)
+        write_manifest(shards,args.manifest_path,args.file_type)
+        for shard in shards:
+            print(f'{shard_name(shard["index"])}: {len(shard["units"])} units, {numerize(shard["bytes"],3)}B')
+        print(f'Manifest saved to {args.manifest_path}')
+    else:
+        merge_shards(args.output_path,args.missing_log_path,args.src_lang,args.num_shards,args.merged_output_path)
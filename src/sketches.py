@@ -0,0 +1,129 @@
+import heapq
+import math
+from array import array
+from hashlib import blake2b
+
+
+def hash64(word:str)->int:
+    """
+    Stable 64-bit hash of a word, identical across processes and runs.
+
+    Args:
+        word (str): Word to hash.
+
+    Returns:
+        int: Unsigned 64-bit hash value.
+    """
+    return int.from_bytes(blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class HyperLogLog:
+    """
+    Approximate distinct counter using 2**precision one-byte registers.
+
+    With the default precision of 14 it uses 16 KB and has a standard error of about 0.8%.
+    """
+    def __init__(self, precision:int=14)->None:
+        if not 4 <= precision <= 18:
+            raise ValueError('precision must be between 4 and 18')
+        self.precision=precision
+        self.num_registers=1 << precision
+        self.registers=bytearray(self.num_registers)
+        self.alpha=0.7213/(1+1.079/self.num_registers)
+
+    def add(self, word:str)->None:
+        h=hash64(word)
+        index=h & (self.num_registers-1)
+        rest=h >> self.precision
+        # rank is the position of the first set bit in the remaining 64-p bits
+        rank=(64-self.precision)-rest.bit_length()+1
+        if rank > self.registers[index]:
+            self.registers[index]=rank
+
+    def __len__(self)->int:
+        return self.count()
+
+    def count(self)->int:
+        """
+        Returns:
+            int: Estimated number of distinct words added so far.
+        """
+        m=self.num_registers
+        estimate=self.alpha*m*m/sum(2.0**-r for r in self.registers)
+        zeros=self.registers.count(0)
+        # small range correction through linear counting
+        if estimate <= 2.5*m and zeros:
+            estimate=m*math.log(m/zeros)
+        return int(round(estimate))
+
+
+class CountMinSketch:
+    """
+    Frequency sketch that never under-estimates a count; over-estimation is bounded by
+    e/width * total_count with probability 1 - exp(-depth).
+    """
+    def __init__(self, width:int=1<<16, depth:int=4)->None:
+        self.width=width
+        self.depth=depth
+        self.rows=[array('Q', bytes(8*width)) for _ in range(depth)]
+
+    def _indices(self, word:str):
+        h=hash64(word)
+        h1,h2=h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1+i*h2) % self.width for i in range(self.depth)]
+
+    def add(self, word:str, count:int=1)->None:
+        for row,index in zip(self.rows,self._indices(word)):
+            row[index]+=count
+
+    def estimate(self, word:str)->int:
+        return min(row[index] for row,index in zip(self.rows,self._indices(word)))
+
+
+class SpaceSaving:
+    """
+    Top-k heavy hitter tracker (Metwally et al.) that keeps at most `capacity` counters.
+
+    Every word whose true frequency is above total/capacity is guaranteed to be tracked and
+    each reported count over-estimates the true count by at most its recorded error.
+    """
+    def __init__(self, capacity:int=1000)->None:
+        self.capacity=capacity
+        self.counts={}
+        self.errors={}
+        # lazy min-heap of (count, word); stale entries are skipped on eviction
+        self._heap=[]
+
+    def add(self, word:str)->None:
+        if word in self.counts:
+            self.counts[word]+=1
+        elif len(self.counts) < self.capacity:
+            self.counts[word]=1
+            self.errors[word]=0
+        else:
+            min_count,min_word=self._pop_min()
+            del self.counts[min_word]
+            del self.errors[min_word]
+            self.counts[word]=min_count+1
+            self.errors[word]=min_count
+        heapq.heappush(self._heap,(self.counts[word],word))
+        if len(self._heap) > 4*self.capacity:
+            self._heap=[(count,w) for w,count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self)->tuple:
+        while True:
+            count,word=heapq.heappop(self._heap)
+            if self.counts.get(word)==count:
+                return count,word
+
+    def top(self, k:int)->list[tuple[str,int,int]]:
+        """
+        Args:
+            k (int): Number of heavy hitters to return.
+
+        Returns:
+            list: (word, count, error) tuples sorted by decreasing count.
+        """
+        ranked=sorted(self.counts.items(), key=lambda item: (-item[1],item[0]))[:k]
+        return [(word,count,self.errors[word]) for word,count in ranked]
@@ -0,0 +1,124 @@
+import sys
+import time
+import argparse
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from numerize.numerize import numerize
+
+
+def gil_enabled()->bool:
+    """
+    Whether this interpreter runs with the GIL, always the case before Python 3.13.
+    """
+    is_gil_enabled=getattr(sys,'_is_gil_enabled',None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+class ThreadedReplacer:
+    """
+    Replaces the rows of a batch on a pool of threads sharing one replacer.
+
+    Rows are split into chunks of `chunk_size` rows and each chunk is replaced by one thread,
+    all threads reading the same dictionary and trie. The replacement only reads the replacer,
+    so no locking is needed as long as it has no line cache. Threads only run in parallel on
+    free-threaded builds, with the GIL they take turns.
+
+    It exposes `replace_batches` like `MemoryWordReplacer`, so it can stand in for it.
+    """
+    def __init__(self, replacer, num_threads:int, chunk_size:int=16)->None:
+        """
+        Args:
+            replacer (MemoryWordReplacer): Replacer shared by the threads.
+            num_threads (int): Number of threads.
+            chunk_size (int): Rows replaced per call of a thread.
+        """
+        self.replacer=replacer
+        self.num_threads=num_threads
+        self.chunk_size=chunk_size
+        # created on first use, a pool can not be pickled along with the replacer
+        self.executor=None
+
+    def replace_batches(self, batch:list, use_placeholder:bool=True)->tuple[list,list]:
+        """
+        Same as `MemoryWordReplacer.replace_batches`, with chunks of rows replaced in parallel.
+        """
+        if self.executor is None:
+            self.executor=ThreadPoolExecutor(max_workers=self.num_threads)
+        chunks=[batch[i:i+self.chunk_size] for i in range(0,len(batch),self.chunk_size)]
+        transliterated,missing_words=[],[]
+        for texts,words in self.executor.map(partial(self.replacer.replace_batches,use_placeholder=use_placeholder),chunks):
+            transliterated.extend(texts)
+            missing_words.extend(words)
+        return transliterated,missing_words
+
+    def close(self)->None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor=None
+
+    def __getstate__(self)->dict:
+        state=self.__dict__.copy()
+        state['executor']=None
+        return state
+
+
+def thread_scaling(replacer, texts:list, worker_counts:list, chunk_size:int=16)->dict:
+    """
+    Throughput in rows per second of one shared replacer on each number of threads.
+    """
+    results={}
+    for num_threads in worker_counts:
+        threaded=ThreadedReplacer(replacer,num_threads,chunk_size)
+        start=time.perf_counter()
+        threaded.replace_batches(texts)
+        results[num_threads]=len(texts)/(time.perf_counter()-start)
+        threaded.close()
+    return results
+
+
+def process_scaling(dictionary_path:str, src_lang:str, texts:list, worker_counts:list, chunk_size:int=16)->dict:
+    """
+    Throughput in rows per second of worker processes each loading their own replacer.
+
+    Workers are warmed up before timing, so dictionary loading is left out as it is for threads.
+    """
+    from replacer_pool import create_replacer_pool,replace_batch
+    task=partial(replace_batch,src_lang,dictionary_path)
+    chunks=[texts[i:i+chunk_size] for i in range(0,len(texts),chunk_size)]
+    results={}
+    for num_workers in worker_counts:
+        pool=create_replacer_pool(num_workers,1)
+        try:
+            list(pool.map(task,[texts[:1]]*num_workers*4))
+            start=time.perf_counter()
+            list(pool.map(task,chunks))
+            results[num_workers]=len(texts)/(time.perf_counter()-start)
+        finally:
+            pool.shutdown()
+    return results
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description='Benchmark how replacement scales on threads sharing one dictionary versus processes.')
+    parser.add_argument('--dictionary_path', type=str, required=True, help='Path to the dictionary JSON or binary (.xdict) file')
+    parser.add_argument('--src_lang', type=str, required=True, help='Source language of the text')
+    parser.add_argument('--texts_path', type=str, required=True, help='Text file with one document per line')
+    parser.add_argument('--max_lines', type=int, default=20000, help='Lines of --texts_path to replace')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1,2,4,8], help='Numbers of threads and processes to measure')
+    parser.add_argument('--chunk_size', type=int, default=16, help='Rows per replace_batches call')
+    parser.add_argument('--skip_processes', action='store_true', help='Only measure threads')
+    args = parser.parse_args()
+
+    from MemoryWordReplacer import MemoryWordReplacer
+    with open(args.texts_path,encoding='utf-8') as file:
+        texts=[line.rstrip('\n') for _,line in zip(range(args.max_lines),file)]
+    replacer=MemoryWordReplacer(args.dictionary_path,src_lang=args.src_lang)
+    print(f'Python {sys.version.split()[0]}, GIL {"enabled" if gil_enabled() else "disabled"}, {numerize(len(texts),3)} lines')
+
+    rows=[('threads',thread_scaling(replacer,texts,args.workers,args.chunk_size))]
+    if not args.skip_processes:
+        rows.append(('processes',process_scaling(args.dictionary_path,args.src_lang,texts,args.workers,args.chunk_size)))
+    baseline=rows[0][1][args.workers[0]]
+    for mode,results in rows:
+        for workers,throughput in results.items():
+            print(f'{mode:>9} {workers:>3}: {numerize(throughput,3)} lines/s, {throughput/baseline:.2f}x')
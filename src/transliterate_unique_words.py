@@ -1,206 +1,622 @@
 import os,re
-import json
+import queue
+import time
+import shutil
 import argparse
+import threading
+import unicodedata
+import multiprocessing
+from glob import glob
+from collections import deque,Counter
+from functools import partial,lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
 from numerize.numerize import numerize
-from datasets import load_dataset,Dataset,concatenate_datasets
-from ai4bharat.transliteration import XlitEngine
 from normalizer import mapping_dict,indic_script_patterns
+from xlit_engine import engine_config,get_engine,init_worker,pin_threads,decoding_mode,batch_transliterate_with_confidence
+from xlit_cache import TransliterationCache
+from dict_io import ShardWriter
+from bindict import write_bindict
 
 
 english_pattern=re.compile(r'[A-Za-z]+')
 punct_no_pattern = re.compile(r'[0-9!"#$%&\'()*+,-./:;<=>?@\[\\\]^_`{|}~\n\t।|॥۔؟]')
 punct_no_pattern_in_mid = re.compile(r'\w[ !-\/:-@\[-`{-~\d]\w')
 
-#Intialize indicxlit engine
-engine =  XlitEngine( beam_width=4, src_script_type = "indic")
+# IndicXlit lang code to script name
+lang_code_scripts={code:lang.split('_')[-1] for lang,code in mapping_dict.items()}
 
+# Decoding statistics of all the batches sent to the model by this run
+decoding_stats=Counter()
 
-def contains_space_symbol_or_number_in_middle(word):
+
+def script_word_pattern(script):
     """
-    Check if a word has a space, symbol, or number in the middle.
+    Compile a pattern matching runs of letters and vowel signs of an Indic script.
+
+    Digits, dandas and other punctuation of the script block are left out, so they are kept
+    unchanged when a sentence is rebuilt.
+
+    Args:
+        script (str): Script name as used in `indic_script_patterns` (e.g., 'Deva').
+
+    Returns:
+        re.Pattern: Pattern matching the words of the script.
     """
-    return bool(punct_no_pattern_in_mid.search(word))
+    script_pattern=indic_script_patterns[script]
+    letters=''.join(
+        char for char in map(chr,range(0x0600,0x0E00))
+        if script_pattern.match(char) and unicodedata.category(char)[0] in 'LM'
+        )
+    # zero width (non-)joiners are part of words in several Indic scripts
+    return re.compile(f'[{re.escape(letters)}\u200c\u200d]+')
+
 
-def remove_punctuation_and_numbers(batch_words):
+def transliterate_sentences(sentences,src_lang,transliterate_words):
     """
-    Clean a list of words by removing punctuation and numbers.
+    Transliterate sentences by running word-level inference on their unique Indic words.
+
+    Each sentence is split into runs of the source script, every distinct run is transliterated
+    once through `transliterate_words` and the sentences are rebuilt around them, keeping
+    symbols, numbers and text in other scripts unchanged.
+
+    Args:
+        sentences (list of str): Sentences to transliterate.
+        src_lang (str): The source language code (e.g., 'hi', 'ta').
+        transliterate_words (callable): Maps a list of unique words to their transliterations.
+
+    Returns:
+        list of str: Transliterated sentences aligned with `sentences`.
     """
-    batch_words=[w for word in batch_words for w in punct_no_pattern.sub(' ',word).strip().split(' ') if w]
-    return batch_words
+    pattern=script_word_pattern(lang_code_scripts[src_lang])
+    words=sorted({word for sentence in sentences for word in pattern.findall(sentence)})
+    mapping=dict(zip(words,transliterate_words(words))) if words else {}
+    return [
+        pattern.sub(lambda match: mapping.get(match.group()) or match.group(),sentence)
+        for sentence in sentences
+        ]
 
 
-def contains_punctuation(word):
+def transliterate(org_batch,src_lang):
     """
-    Determine if a word contains punctuation.
+    Transliterates a batch of words from the source language to English.
+
+    Sentences are handled by `transliterate_sentences`, which sends their words here.
+
+    Parameters:
+    org_batch (list of str): The original words to be transliterated.
+    src_lang (str): The source language code (e.g., 'hi', 'ta').
+
+    Returns:
+    dict: The list of transliterated words under 'transliterated' and the decoding statistics under 'stats'.
     """
-    return bool(punct_no_pattern.search(word))
+    if engine_config['adaptive_beam']:
+        batch,stats=adaptive_transliterate(org_batch,src_lang)
+    else:
+        batch,stats=batch_transliterate(get_engine(),org_batch,src_lang),Counter(words=len(org_batch))
+    return {'transliterated':batch,'stats':stats}
+
 
-def contains_english_words(s):
+def batch_transliterate(engine,org_batch,src_lang):
     """
-    Check if a string contains English letters.
+    Word-level transliteration of a batch, falling back to word by word transliteration on failure.
     """
-    return bool(english_pattern.search(s))
+    try:
+        batch=engine.batch_transliterate_words(
+                org_batch,
+                src_lang=src_lang,
+                tgt_lang='en',
+                topk=1
+        )
+        #check the length of the batch
+        assert len(org_batch)==len(batch[0])
 
+    except Exception as e:
+        print(f'Failed on batch transliteration due to {e if e else "input size not equal to output size"}, continuing with word transliteration')
+        
+        # Word by word transliteration
+        batch=[[engine.translit_word(word,src_lang,topk=1)[0] for word in org_batch]]
 
-def ds_to_json(ds,column):
-    # Convert to Pandas DataFrame
-    df = ds.to_pandas()
-    
-    # Ensure the columns are named correctly
-    if column not in df.columns or 'transliterated' not in df.columns:
-        raise ValueError(f"Expected columns {column} and 'transliterated' not found")
+    return batch[0]
 
-    # Convert the DataFrame to a dictionary
-    dictionary = df.set_index(column)['transliterated'].to_dict()
-    return dictionary
 
+def adaptive_transliterate(org_batch,src_lang):
+    """
+    Tiered decoding: decode greedily and only re-decode low confidence words with the full beam.
 
+    Words whose greedy output has a confidence below `engine_config['confidence_threshold']`,
+    or whose confidence could not be read from the engine, are decoded again with the full beam.
+    Agreement between both decodings is only counted for words that were actually decoded
+    greedily.
 
-def transliterate(org_batch,src_lang,use_sentence_transliterate=False):
+    Returns:
+        tuple: Transliterations aligned with `org_batch` and a Counter of decoding statistics.
     """
-    Transliterates a batch of text from the source language to English.
+    greedy_decoded=True
+    try:
+        batch,confidences=batch_transliterate_with_confidence(get_engine(beam_width=1),org_batch,src_lang)
+        assert len(org_batch)==len(batch)
+    except Exception as e:
+        print(f'Failed on greedy transliteration due to {e}, continuing with beam search')
+        batch,confidences=list(org_batch),[None]*len(org_batch)
+        greedy_decoded=False
+
+    threshold=engine_config['confidence_threshold']
+    uncertain=[i for i,confidence in enumerate(confidences) if confidence is None or confidence<threshold]
+    stats=Counter(words=len(org_batch),greedy_accepted=len(org_batch)-len(uncertain),redecoded=len(uncertain))
+    if uncertain:
+        beam_batch=batch_transliterate(get_engine(),[org_batch[i] for i in uncertain],src_lang)
+        batch=list(batch)
+        for index,word in zip(uncertain,beam_batch):
+            if greedy_decoded:
+                stats['compared']+=1
+                stats['agreed']+=batch[index]==word
+            batch[index]=word
+    return batch,stats
+
+
+def decoding_report(src_lang,stats,seconds):
+    """
+    Summarise the words decoded by the model, their throughput and how adaptive decoding behaved.
+    """
+    words=stats['words']
+    report=f'{src_lang}: {numerize(words,3)} words decoded in {seconds:.1f}s ({words/max(seconds,1e-9):.1f} words/s)'
+    if engine_config['adaptive_beam'] and words:
+        report+=(
+            f', {stats["greedy_accepted"]/words:.2%} accepted after greedy decoding'
+            f', {numerize(stats["redecoded"],3)} re-decoded with beam {engine_config["beam_width"]}'
+            )
+        if stats['compared']:
+            report+=f' of which {stats["agreed"]/stats["compared"]:.2%} agreed with greedy'
+    return report
 
-    This function supports both word-level and sentence-level transliteration.
 
-    Parameters:
-    org_batch (list of str): The original text batch to be transliterated.
-    src_lang (str): The source language code (e.g., 'hi', 'ta').
-    use_sentence_transliterate (bool): Flag to use sentence-level transliteration if True; otherwise, word-level.
+def transliterate_chunk(chunk,src_lang):
+    """
+    Pool task transliterating one batch of words with the engine of the worker.
 
     Returns:
-    dict: A dictionary with a key 'transliterated' containing the list of transliterated text.
-    
-    Note:sentence transliterate preserves symbols,punctuations, numbers and other languages
+        tuple: The transliterations and the decoding statistics of the batch.
+    """
+    output=transliterate(chunk,src_lang)
+    return output['transliterated'],output['stats']
+
 
+def create_inference_pool(num_workers,torch_threads=1):
     """
-    if use_sentence_transliterate:
-         # Combine the batch into a single string for sentence-level transliteration
-        batch='[batch]'.join(org_batch)
-        try:
-            batch=engine._transliterate_sentence(text=batch,src_lang=src_lang,tgt_lang='en').split('[batch]')
-            # Verify if transliteration count matches input count
-            if len(batch)!=len(org_batch):
-                batch=[engine._transliterate_sentence(text=word,src_lang=src_lang,tgt_lang='en') for word in org_batch]
+    Create a pool of processes that each lazily load their own engine on the first batch.
 
-        except Exception as e:
-            print(f'Failed on sentence transliteration due to {e.message}')
+    Args:
+        num_workers (int): Number of worker processes.
+        torch_threads (int): Torch threads pinned in every worker.
 
-        return {'transliterated':batch}
-    
-    else:
-        try:
-            batch=engine.batch_transliterate_words(
-                    org_batch,
-                    src_lang=src_lang,
-                    tgt_lang='en',
-                    topk=1
-            )
-            #check the length of the batch
-            assert len(org_batch)==len(batch[0])
+    Returns:
+        ProcessPoolExecutor: The inference pool.
+    """
+    # spawn keeps the workers free of the parent's arrow and torch thread state
+    return ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_worker,
+        initargs=(dict(engine_config),torch_threads)
+        )
+
+
+def length_bucketed_batches(words,batch_size,max_tokens=None):
+    """
+    Group words of similar length into batches to minimise padding in beam search.
+
+    Args:
+        words (list of str): Words to batch.
+        batch_size (int): Maximum number of words in a batch.
+        max_tokens (int): If given, batches are sized by a budget of padded characters
+            (batch length x longest word) instead of `batch_size`.
+
+    Returns:
+        list of list of int: Indices into `words` for every batch, shortest words first.
+    """
+    order=sorted(range(len(words)),key=lambda i:len(words[i]))
+    batches,batch=[],[]
+    for index in order:
+        # words are visited by increasing length, so the new word is the longest of the batch
+        if batch and (
+            (len(batch)+1)*(len(words[index])+1)>max_tokens if max_tokens
+            else len(batch)>=batch_size
+            ):
+            batches.append(batch)
+            batch=[]
+        batch.append(index)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def run_batches(words,batches,src_lang,pool=None,desc=None,on_result=None):
+    """
+    Transliterate the given batches of words and restore the original order of `words`.
+
+    Args:
+        words (list of str): Words to transliterate.
+        batches (list of list of int): Indices into `words` making up every batch.
+        src_lang (str): The source language code (e.g., 'hi', 'ta').
+        pool (ProcessPoolExecutor): Optional pool created by `create_inference_pool`, batches
+            run in the current process otherwise.
+        desc (str): Description of the progress bar.
+        on_result (callable): Called with the words and results of every batch as it finishes.
+
+    Returns:
+        list of str: Transliterations aligned with `words`.
+    """
+    task=partial(transliterate_chunk,src_lang=src_lang)
+    chunks=([words[i] for i in batch] for batch in batches)
+    results=pool.map(task,chunks) if pool else map(task,chunks)
+    transliterated=[None]*len(words)
+    for batch,(result,stats) in tqdm(zip(batches,results),total=len(batches),desc=desc):
+        decoding_stats.update(stats)
+        for index,word in zip(batch,result):
+            transliterated[index]=word
+        if on_result:
+            on_result(zip((words[index] for index in batch),result))
+    return transliterated
+
+
+def transliterate_with_cache(words,src_lang,batch_size,max_tokens=None,pool=None,cache=None,desc=None,writer=None):
+    """
+    Transliterate words, only sending the ones missing from the persistent cache to the model.
 
-        except Exception as e:
-            print(f'Failed on batch transliteration due to {e if e else "input size not equal to output size"}, continuing with word transliteration')
-            
-            # Word by word transliteration
-            batch=[[engine.translit_word(word,src_lang,topk=1)[0] for word in org_batch]]
+    New results are written back to the cache in bulk once inference is done. With a checkpoint
+    writer, words finished by an earlier attempt of the run are skipped and every batch is
+    appended to the checkpoint as soon as it completes.
 
-        return {'transliterated':batch[0]}        
+    Args:
+        words (list of str): Unique words to transliterate.
+        src_lang (str): The source language code (e.g., 'hi', 'ta').
+        batch_size (int): Number of words sent to the engine at once.
+        max_tokens (int): Optional budget of padded characters per word batch.
+        pool (ProcessPoolExecutor): Optional pool created by `create_inference_pool`.
+        cache (TransliterationCache): Optional cache of earlier model outputs.
+        desc (str): Description of the progress bar.
+        writer (ShardWriter): Optional checkpoint of the run.
 
+    Returns:
+        list of str: Transliterations aligned with `words`.
+    """
+    cache_key=dict(
+        src_lang=src_lang,
+        beam_width=engine_config['beam_width'],
+        topk=1,
+        mode=decoding_mode()
+        )
+    known={}
+    if writer is not None:
+        known={word:writer.done[word] for word in words if word in writer.done}
+        if known:
+            print(f'{numerize(len(known),3)} of {numerize(len(words),3)} already done in the checkpoint')
+    if cache is not None:
+        hits=cache.get_many([word for word in words if word not in known],**cache_key)
+        if hits:
+            print(f'{numerize(len(hits),3)} of {numerize(len(words),3)} found in the transliteration cache')
+            if writer is not None:
+                writer.append(hits.items())
+            known.update(hits)
+    pending=[word for word in words if word not in known]
+
+    batches=length_bucketed_batches(pending,batch_size,max_tokens)
+    transliterated=run_batches(pending,batches,src_lang,pool,desc,writer.append if writer is not None else None)
+
+    if cache is not None:
+        cache.put_many(zip(pending,transliterated),**cache_key)
+    known.update(zip(pending,transliterated))
+    return [known[word] for word in words]
+
+
+def transliterate_using_hugging_face(input_path,column,src_lang,batch_size,cache_dir,num_proc=8,num_workers=1,torch_threads=1,max_tokens=None,cache=None,writer=None):
+    from datasets import load_dataset
 
-def transliterate_using_hugging_face(input_path,column,src_lang,batch_size,cache_dir,num_proc=8):
-    
     ds=load_dataset(
         'csv',
         data_files=input_path,
-        cache_dir=cache_dir
+        cache_dir=cache_dir,
+        num_proc=num_proc
     )
 
-    #de-dup
-    ds=ds['train'].to_pandas()
-    ds = ds[ds[column].notnull()].drop_duplicates(column).reset_index()
-    ds=Dataset.from_pandas(ds)
-    sent_ds=ds.filter(
-        lambda x : contains_space_symbol_or_number_in_middle(x[column])
-         or 
-         contains_english_words(x[column]),num_proc=num_proc
-         )
-    sent_ds=sent_ds.to_pandas().drop_duplicates(column)
-    sent_ds=Dataset.from_pandas(sent_ds)
-    ds=ds.filter(
-        lambda x : not contains_space_symbol_or_number_in_middle(x[column]) 
-        and not contains_english_words(x[column]) 
-        and len(x[column])<=100,num_proc=num_proc
-        )
-    
-    ds=ds.map(lambda batch : {
-        column:remove_punctuation_and_numbers(batch[column])
-        },
-        remove_columns=ds.column_names,
-        num_proc=num_proc,
-        batched=True)
-    script=src_lang.split('_')[-1]
-    ds=ds.filter(lambda x : indic_script_patterns[script].search(x[column]),num_proc=num_proc)
-    ds=ds.to_pandas().drop_duplicates(column)
-    ds=Dataset.from_pandas(ds)
-
-    if ds.num_rows:
-        ds=ds.map(
-            lambda x: transliterate(x[column],mapping_dict[src_lang],False),
-            batched=True,
-            batch_size=batch_size,
-            desc=f'batch transliteration ({numerize(ds.num_rows,3)} words)'
-    
-        )
-    if sent_ds.num_rows:
-        sent_ds=sent_ds.map(
-            lambda x: transliterate(x[column],mapping_dict[src_lang],True),
-            batched=True,
-            batch_size=batch_size,
-            desc=f'sentence transliteration ({numerize(sent_ds.num_rows,3)} words)'
-        )
-    ds=concatenate_datasets([ds,sent_ds])
-    print(f'\nTotal words transliterated {numerize(ds.num_rows,3)}')
+    # de-dup and split into word and sentence buckets in a single pass
+    words,sentences=classify_words(ds['train'].to_pandas()[column],src_lang.split('_')[-1])
+
+    lang_code=mapping_dict[src_lang]
+    pool=create_inference_pool(num_workers,torch_threads) if num_workers>1 else None
+    try:
+        known=dict(zip(words,transliterate_with_cache(
+            words,lang_code,batch_size,max_tokens,pool,cache,
+            desc=f'batch transliteration ({numerize(len(words),3)} words)',
+            writer=writer
+            )))
+
+        def transliterate_sentence_words(sentence_words):
+            # words already transliterated in the word bucket are not sent to the model again
+            pending=[word for word in sentence_words if word not in known]
+            known.update(zip(pending,transliterate_with_cache(
+                pending,lang_code,batch_size,max_tokens,pool,cache,
+                desc=f'sentence transliteration ({numerize(len(sentences),3)} sentences, {numerize(len(pending),3)} new words)',
+                writer=writer
+                )))
+            return [known[word] for word in sentence_words]
+
+        sentence_transliterations=transliterate_sentences(sentences,lang_code,transliterate_sentence_words)
+        known.update(zip(sentences,sentence_transliterations))
+        if writer is not None:
+            writer.append(zip(sentences,sentence_transliterations))
+    finally:
+        if pool:
+            pool.shutdown()
+    print(f'\nTotal words transliterated {numerize(len(known),3)}')
+    return known
+
+def classify_words(rows,script):
+    """
+    Deduplicate raw rows and split them into a word bucket and a sentence bucket in one pass.
 
-    return ds
+    Rows with english letters or with a space, symbol or number in the middle go to the sentence
+    bucket. Other rows up to 100 characters are stripped of punctuation and numbers and their
+    words go to the word bucket if they contain the source script; the rest are dropped.
+    Deduplication and splitting run on pandas string methods. The patterns are applied with python
+    `re` through `map`, as the Arrow backed strings of pandas 3 would run them on RE2, which
+    rejects the code point escapes of the script patterns.
 
-def store_data_as_json(input_data,src_lang,file_path):
-    """
-    Store the given data as a JSON file.
-    
     Args:
-    input_data (dict): The data to be stored.
-    file_path (str): The path where the JSON file will be saved.
-    
+        rows (iterable of str): Raw rows of the input column, may contain nulls.
+        script (str): Script name of the source language (e.g., 'Deva').
+
     Returns:
-    None: The function doesn't return anything but saves the data to a file.
+        tuple: The list of unique words and the list of unique sentences.
+    """
+    import pandas as pd
+    rows=pd.Series(rows,dtype=object).dropna().astype(str).drop_duplicates()
+    is_sentence=rows.map(punct_no_pattern_in_mid.search).notna()|rows.map(english_pattern.search).notna()
+    sentences=rows[is_sentence]
+
+    words=rows[~is_sentence & (rows.str.len()<=100)]
+    words=words.map(lambda row:punct_no_pattern.sub(' ',row)).str.strip().str.split(' ').explode()
+    words=words[words.notna() & (words!='')]
+    words=words[words.map(indic_script_patterns[script].search).notna()].drop_duplicates()
+    return words.tolist(),sentences.tolist()
 
+
+def read_csv_chunks(input_path,column,chunk_size):
+    """
+    Lazily read the non-null values of a column from one or more CSV files in chunks of rows.
     """
-    os.makedirs(file_path,exist_ok=True)
-    with open(f'{file_path}/{src_lang}.json', 'w') as file:
-        json.dump(input_data, file, indent=4,ensure_ascii=False)
-    print(f'saved dict in {file_path}')
+    import pandas as pd
+    for path in sorted(glob(input_path)) or [input_path]:
+        for chunk in pd.read_csv(path,usecols=[column],dtype=str,chunksize=chunk_size):
+            yield chunk[column].dropna().tolist()
 
-if __name__ == '__main__':
+
+def transliterate_streaming(input_path,column,src_lang,batch_size,chunk_size=100000,queue_size=8,num_workers=1,torch_threads=1,max_tokens=None,cache=None,writer=None):
+    """
+    Transliterate a CSV of words with cleaning, inference and writing overlapped in a pipeline.
+
+    A reader thread loads, deduplicates and classifies the next chunks while the model works on
+    the current batches, and a writer thread collects results (and fills the cache and the
+    checkpoint) as soon as they come back. Stages are connected by bounded queues so memory
+    stays flat.
+
+    Args:
+        input_path (str): Path or glob of the input CSV files.
+        column (str): Column holding the words.
+        src_lang (str): Source language (e.g., 'hin_Deva').
+        batch_size (int): Number of words sent to the engine at once.
+        chunk_size (int): Rows read from the CSV per chunk.
+        queue_size (int): Maximum number of batches waiting in each queue.
+        num_workers (int): Number of inference processes, inference runs in this process if 1.
+        torch_threads (int): Torch threads pinned in every worker.
+        max_tokens (int): Optional budget of padded characters per word batch.
+        cache (TransliterationCache): Optional cache of earlier model outputs.
+        writer (ShardWriter): Optional checkpoint of the run, words it already holds are skipped.
+
+    Returns:
+        dict: Mapping of every word and sentence to its transliteration.
+    """
+    lang_code=mapping_dict[src_lang]
+    script=src_lang.split('_')[-1]
+    word_pattern=script_word_pattern(script)
+    cache_key=dict(src_lang=lang_code,beam_width=engine_config['beam_width'],topk=1,mode=decoding_mode())
+    end_of_stream=None
+
+    batch_queue=queue.Queue(maxsize=queue_size)
+    result_queue=queue.Queue(maxsize=queue_size)
+    # the checkpoint keeps its finished entries in `done`, results are collected there directly
+    known=writer.done if writer is not None else {}
+    sentences={}
+    errors=[]
+
+    def produce():
+        seen=set()
+        try:
+            for rows in read_csv_chunks(input_path,column,chunk_size):
+                words,chunk_sentences=classify_words(rows,script)
+                for sentence in chunk_sentences:
+                    if sentence not in sentences:
+                        sentences[sentence]=None
+                        words.extend(word_pattern.findall(sentence))
+                words=[word for word in dict.fromkeys(words) if word not in seen and word not in known]
+                seen.update(words)
+                if cache is not None and words:
+                    hits=cache.get_many(words,**cache_key)
+                    if hits:
+                        result_queue.put((list(hits.items()),False))
+                        words=[word for word in words if word not in hits]
+                for batch in length_bucketed_batches(words,batch_size,max_tokens):
+                    batch_queue.put([words[i] for i in batch])
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            batch_queue.put(end_of_stream)
+
+    def write():
+        while (item:=result_queue.get()) is not end_of_stream:
+            items,from_model=item
+            try:
+                if errors:
+                    continue
+                if writer is not None:
+                    writer.append(items)
+                else:
+                    known.update(items)
+                if cache is not None and from_model:
+                    cache.put_many(items,**cache_key)
+            except BaseException as e:
+                # keep draining the queue so the inference loop never blocks on a dead writer
+                errors.append(e)
+
+    producer_thread=threading.Thread(target=produce,daemon=True)
+    writer_thread=threading.Thread(target=write,daemon=True)
+    producer_thread.start()
+    writer_thread.start()
+
+    pool=create_inference_pool(num_workers,torch_threads) if num_workers>1 else None
+    in_flight=deque()
+    try:
+        with tqdm(desc='streaming transliteration',unit=' words') as progress:
+            def emit(batch,output):
+                result,stats=output
+                decoding_stats.update(stats)
+                result_queue.put((list(zip(batch,result)),True))
+                progress.update(len(batch))
+
+            while (batch:=batch_queue.get()) is not end_of_stream:
+                if pool:
+                    in_flight.append((batch,pool.submit(transliterate_chunk,batch,lang_code)))
+                    # keep every worker busy without queueing the whole input in the pool
+                    while len(in_flight)>2*num_workers:
+                        done,future=in_flight.popleft()
+                        emit(done,future.result())
+                else:
+                    emit(batch,transliterate_chunk(batch,lang_code))
+            while in_flight:
+                done,future=in_flight.popleft()
+                emit(done,future.result())
+        producer_thread.join()
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+        result_queue.put(end_of_stream)
+        writer_thread.join()
+    if errors:
+        raise errors[0]
+
+    sentences=list(sentences)
+    sentence_transliterations=transliterate_sentences(sentences,lang_code,lambda words:[known.get(word) for word in words])
+    known.update(zip(sentences,sentence_transliterations))
+    if writer is not None:
+        writer.append(zip(sentences,sentence_transliterations))
+    print(f'\nTotal words transliterated {numerize(len(known),3)}')
+    return known
+
+
+def dictionary_output_path(output_json_path,src_lang,output_format='json'):
+    """
+    Path of the final dictionary of a language under `--output_json_path`.
+    """
+    return os.path.join(output_json_path,f'{src_lang}.{output_format}')
+
+
+def get_parser():
     parser = argparse.ArgumentParser(description='Transliterate words using Hugging Face and store results in JSON.')
     parser.add_argument('--input_path', type=str, required=True, help='Path to the input CSV file')
     parser.add_argument('--column_name', type=str, required=True, help='column_name')
-    parser.add_argument('--src_lang', type=str, required=True, help='Source language code')
+    parser.add_argument('--src_lang', type=str, required=True, choices=list(mapping_dict), help='Source language code (e.g., hin_Deva)')
     parser.add_argument('--batch_size', type=int, default=32, help='Batch size for processing')
     parser.add_argument('--cache_dir', type=str, default='/data/umashankar/.cache', help='Cache directory for Hugging Face datasets')
     parser.add_argument('--output_json_path', type=str, default='output.json', help='Path to store the output JSON file')
     parser.add_argument('--num_proc', type=int, default=8, help='Batch size for processing')
-    args = parser.parse_args()
-
-    # Use the parsed arguments
-    ds = transliterate_using_hugging_face(
-        args.input_path,
-        args.column_name,
-        args.src_lang,
-        args.batch_size,
-        args.cache_dir,
-        args.num_proc
-    )
+    parser.add_argument('--num_workers', type=int, default=1, help='Inference processes, each loading its own engine')
+    parser.add_argument('--torch_threads', type=int, default=None, help='Torch intra-op threads per inference process (1 per pool worker by default)')
+    parser.add_argument('--interop_threads', type=int, default=1, help='Torch inter-op threads per inference process')
+    parser.add_argument('--quantize', action='store_true', help='Apply dynamic int8 quantization to the model for faster CPU inference')
+    parser.add_argument('--adaptive_beam', action='store_true', help='Decode greedily first and only re-decode low confidence words with the full beam')
+    parser.add_argument('--confidence_threshold', type=float, default=0.8, help='Greedy outputs below this confidence are re-decoded in --adaptive_beam mode')
+    parser.add_argument('--streaming', action='store_true', help='Overlap reading, cleaning, inference and writing in a pipeline with bounded queues')
+    parser.add_argument('--chunk_size', type=int, default=100000, help='Rows read from the input per chunk in --streaming mode')
+    parser.add_argument('--queue_size', type=int, default=8, help='Batches buffered between the stages of --streaming mode')
+    parser.add_argument('--max_tokens', type=int, default=None, help='Size word batches by a budget of padded characters instead of --batch_size')
+    parser.add_argument('--xlit_cache_path', type=str, default=None, help='SQLite cache of model outputs consulted before inference, defaults to <cache_dir>/xlit_cache.sqlite')
+    parser.add_argument('--no_xlit_cache', action='store_true', help='Always run the model, without reading or writing the transliteration cache')
+    parser.add_argument('--checkpoint_dir', type=str, default=None, help='Directory of the append-only result shards, defaults to <output_json_path>/<src_lang>.checkpoint')
+    parser.add_argument('--shard_size', type=int, default=1000000, help='Entries per checkpoint shard')
+    parser.add_argument('--restart', action='store_true', help='Discard an existing checkpoint instead of resuming from it')
+    parser.add_argument('--beam_width', type=int, default=4, help='Beam width of the IndicXlit engine')
+    parser.add_argument('--output_format', type=str, choices=['json','xdict'], default='json', help='Write the final dictionary as JSON or as a binary dictionary')
+    return parser
 
-    # Save the dataset to JSON
-    ds_dict = ds_to_json(ds,args.column_name)
-    store_data_as_json(ds_dict, args.src_lang,args.output_json_path)
\ No newline at end of file
+
+if __name__ == '__main__':
+    args = get_parser().parse_args()
+
+    engine_config['beam_width']=args.beam_width
+    engine_config['quantize']=args.quantize
+    engine_config['interop_threads']=args.interop_threads
+    engine_config['adaptive_beam']=args.adaptive_beam
+    engine_config['confidence_threshold']=args.confidence_threshold
+    if args.num_workers<=1 and args.torch_threads:
+        pin_threads(args.torch_threads,args.interop_threads)
+    cache=None
+    if not args.no_xlit_cache:
+        cache=TransliterationCache(args.xlit_cache_path or os.path.join(args.cache_dir,'xlit_cache.sqlite'))
+
+    checkpoint_dir=args.checkpoint_dir or os.path.join(args.output_json_path,f'{args.src_lang}.checkpoint')
+    if args.restart and os.path.isdir(checkpoint_dir):
+        shutil.rmtree(checkpoint_dir)
+    writer=ShardWriter(
+        checkpoint_dir,
+        args.shard_size,
+        metadata={'input_path':args.input_path,'src_lang':args.src_lang,'beam_width':args.beam_width,'decoding_mode':decoding_mode()}
+        )
+    if writer.done:
+        print(f'Resuming from {checkpoint_dir} with {numerize(len(writer.done),3)} words already done')
+
+    start=time.perf_counter()
+    try:
+        if args.streaming:
+            transliterate_streaming(
+                args.input_path,
+                args.column_name,
+                args.src_lang,
+                args.batch_size,
+                args.chunk_size,
+                args.queue_size,
+                args.num_workers,
+                args.torch_threads or 1,
+                args.max_tokens,
+                cache,
+                writer
+            )
+        else:
+            # Use the parsed arguments
+            transliterate_using_hugging_face(
+                args.input_path,
+                args.column_name,
+                args.src_lang,
+                args.batch_size,
+                args.cache_dir,
+                args.num_proc,
+                args.num_workers,
+                args.torch_threads or 1,
+                args.max_tokens,
+                cache,
+                writer
+            )
+    finally:
+        if cache is not None:
+            cache.close()
+
+    print(decoding_report(args.src_lang,decoding_stats,time.perf_counter()-start))
+
+    # Compact the checkpoint into the final dictionary
+    output_file=dictionary_output_path(args.output_json_path,args.src_lang,args.output_format)
+    if args.output_format=='xdict':
+        metadata={'language':args.src_lang,'source':args.input_path,'beam_width':args.beam_width,'decoding_mode':decoding_mode()}
+        count=writer.compact(output_file,lambda items,path:write_bindict(sorted(items),path,metadata=metadata,presorted=True))
+    else:
+        count=writer.compact(output_file)
+    print(f'saved dict with {numerize(count,3)} words in {output_file}')
@@ -0,0 +1,48 @@
+import os
+import json
+from glob import glob
+
+
+class WorkerStatsFile:
+    """
+    Statistics of one process in `<stats_dir>/worker-<pid>.json`, rewritten in place.
+
+    The file is opened once per process and every write overwrites it from the start with a
+    single `pwrite`, padded with spaces to the longest record written so far, so writing after
+    every batch costs one system call and the last write always holds the final counts. A copy
+    sent to a worker process opens its own file on its first write.
+    """
+    def __init__(self, stats_dir:str)->None:
+        """
+        Args:
+            stats_dir (str): Directory for the per process statistics files.
+        """
+        self.stats_dir=stats_dir
+        self.fd=self.pid=None
+        self.length=0
+
+    def write(self, stats:dict)->None:
+        if self.pid!=os.getpid():
+            os.makedirs(self.stats_dir,exist_ok=True)
+            path=os.path.join(self.stats_dir,f'worker-{os.getpid()}.json')
+            self.fd=os.open(path,os.O_WRONLY|os.O_CREAT|os.O_TRUNC,0o644)
+            self.pid=os.getpid()
+            self.length=0
+        record=json.dumps(stats).encode('utf-8')
+        self.length=max(self.length,len(record))
+        os.pwrite(self.fd,record.ljust(self.length),0)
+
+    def __getstate__(self)->dict:
+        state=self.__dict__.copy()
+        state['fd']=state['pid']=None
+        state['length']=0
+        return state
+
+
+def read_worker_stats(stats_dir:str):
+    """
+    Statistics written by every process under `stats_dir`.
+    """
+    for path in glob(os.path.join(stats_dir,'worker-*.json')):
+        with open(path) as file:
+            yield json.load(file)
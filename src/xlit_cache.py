@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import threading
+
+
+class TransliterationCache:
+    """
+    Persistent SQLite store of model transliterations shared by all runs.
+
+    Entries are keyed by (src_lang, word, beam_width, topk, mode) so results decoded with
+    different engine settings never shadow each other. A cache may be shared by the threads
+    of a process, access to the connection is serialised by a lock. It can be used as a context
+    manager to close the connection when done.
+    """
+    # keeps the number of bound parameters below the SQLite limit
+    lookup_chunk_size=500
+
+    def __init__(self, path:str)->None:
+        directory=os.path.dirname(path)
+        if directory:
+            os.makedirs(directory,exist_ok=True)
+        self.path=path
+        self.lock=threading.Lock()
+        self.connection=sqlite3.connect(path,check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS transliterations (
+                src_lang TEXT NOT NULL,
+                word TEXT NOT NULL,
+                beam_width INTEGER NOT NULL,
+                topk INTEGER NOT NULL,
+                mode TEXT NOT NULL,
+                transliteration TEXT NOT NULL,
+                PRIMARY KEY (src_lang, word, beam_width, topk, mode)
+            ) WITHOUT ROWID
+        ''')
+        self.connection.commit()
+
+    def get_many(self, words:list, src_lang:str, beam_width:int, topk:int, mode:str)->dict:
+        """
+        Look up cached transliterations of many words at once.
+
+        Args:
+            words (list of str): Words to look up.
+            src_lang (str): The source language code (e.g., 'hi', 'ta').
+            beam_width (int): Beam width the results were decoded with.
+            topk (int): Number of candidates the results were decoded with.
+            mode (str): Decoding setup the results were decoded with, as named by
+                `xlit_engine.decoding_mode` (e.g., 'word', 'word-adaptive0.8-int8').
+
+        Returns:
+            dict: Mapping of the words found in the cache to their transliteration.
+        """
+        found={}
+        for i in range(0,len(words),self.lookup_chunk_size):
+            chunk=words[i:i+self.lookup_chunk_size]
+            with self.lock:
+                rows=self.connection.execute(
+                    f'''SELECT word, transliteration FROM transliterations
+                    WHERE src_lang=? AND beam_width=? AND topk=? AND mode=?
+                    AND word IN ({",".join("?"*len(chunk))})''',
+                    (src_lang,beam_width,topk,mode,*chunk)
+                ).fetchall()
+            found.update(rows)
+        return found
+
+    def put_many(self, items, src_lang:str, beam_width:int, topk:int, mode:str)->None:
+        """
+        Write (word, transliteration) pairs to the cache in a single transaction.
+        """
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO transliterations VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    (src_lang,word,beam_width,topk,mode,transliteration)
+                    for word,transliteration in items if transliteration is not None
+                )
+            )
+
+    def __len__(self)->int:
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM transliterations').fetchone()[0]
+
+    def close(self)->None:
+        with self.lock:
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc)->None:
+        self.close()
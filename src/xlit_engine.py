@@ -0,0 +1,151 @@
+import os
+
+# Engine settings of the current process, overridden in pool workers by `init_worker`
+engine_config={
+    'beam_width':4,
+    'src_script_type':'indic',
+    'quantize':False,
+    'interop_threads':1,
+    'adaptive_beam':False,
+    'confidence_threshold':0.8,
+}
+
+_engines={}
+
+
+def pin_threads(intra_op_threads:int, inter_op_threads:int=1)->None:
+    """
+    Pin the number of threads torch and the BLAS backends may use in this process.
+
+    Environment variables are only honoured if torch has not been imported yet, so this
+    should run before the first engine is built.
+
+    Args:
+        intra_op_threads (int): Threads used inside a single operator.
+        inter_op_threads (int): Threads used to run independent operators in parallel.
+    """
+    for var in ('OMP_NUM_THREADS','MKL_NUM_THREADS','OPENBLAS_NUM_THREADS'):
+        os.environ[var]=str(intra_op_threads)
+    import torch
+    torch.set_num_threads(intra_op_threads)
+    try:
+        torch.set_num_interop_threads(inter_op_threads)
+    except RuntimeError:
+        # inter-op threads can only be set once per process, before any parallel work
+        pass
+
+
+def decoding_mode()->str:
+    """
+    Name of the decoding setup of this process, used to keep results of different setups apart.
+    """
+    mode='word'
+    if engine_config['adaptive_beam']:
+        mode+=f'-adaptive{engine_config["confidence_threshold"]}'
+    if engine_config['quantize']:
+        mode+='-int8'
+    return mode
+
+
+def batch_transliterate_with_confidence(engine, words:list, src_lang:str)->tuple[list,list]:
+    """
+    Top-1 transliterations of a batch of words along with the model confidence of each.
+
+    IndicXlit does not return hypothesis scores, so the fairseq output of the engine's
+    transliterator is captured while `batch_transliterate_words` runs. Its `H-<id>` lines hold
+    the length normalised log2 probability of every hypothesis, the confidence is two to the
+    power of it, i.e. the geometric mean probability of the output characters.
+
+    Args:
+        engine (XlitEngine): Engine to decode with.
+        words (list of str): Words to transliterate.
+        src_lang (str): The source language code (e.g., 'hi', 'ta').
+
+    Returns:
+        tuple: Top-1 transliterations and confidences in [0, 1], confidences are None when
+            the engine output could not be parsed.
+    """
+    transliterator=engine.transliterator
+    captured=[]
+    translate=transliterator.translate
+
+    def capture(*args,**kwargs):
+        output=translate(*args,**kwargs)
+        captured.append(output)
+        return output
+
+    transliterator.translate=capture
+    try:
+        output=engine.batch_transliterate_words(words,src_lang=src_lang,tgt_lang='en',topk=1)
+    finally:
+        transliterator.translate=translate
+
+    confidences=[None]*len(words)
+    for translation_str in captured:
+        for line in translation_str.split('\n'):
+            if line.startswith('H-'):
+                fields=line.split('\t')
+                index=int(fields[0][2:])
+                if index<len(words):
+                    confidence=2**float(fields[1])
+                    confidences[index]=max(confidences[index] or 0.0,confidence)
+    return output[0],confidences
+
+
+def quantize_engine(engine)->None:
+    """
+    Apply dynamic int8 quantization to the linear layers of the engine's models, in place.
+
+    Quantizing in place keeps the beam search generator, which holds its own references to the
+    models, pointed at the quantized modules.
+
+    Raises:
+        ValueError: If no torch models are found on the engine.
+    """
+    import torch
+    transliterator=getattr(engine,'transliterator',engine)
+    models=getattr(transliterator,'models',None) or [
+        value for value in vars(transliterator).values() if isinstance(value,torch.nn.Module)
+        ]
+    if not models:
+        raise ValueError(f'No torch models found on {type(engine).__name__} to quantize')
+    for model in models:
+        model.eval()
+        torch.quantization.quantize_dynamic(model,{torch.nn.Linear},dtype=torch.qint8,inplace=True)
+
+
+def get_engine(beam_width:int=None, quantize:bool=None):
+    """
+    Return the IndicXlit engine of this process, building it on first use.
+
+    Engines are cached per beam width and precision so the model is loaded at most once per
+    process and setup.
+
+    Args:
+        beam_width (int): Beam width of the engine, defaults to `engine_config['beam_width']`.
+        quantize (bool): Use int8 dynamic quantization, defaults to `engine_config['quantize']`.
+
+    Returns:
+        XlitEngine: Engine transliterating indic scripts to english.
+    """
+    beam_width=beam_width or engine_config['beam_width']
+    quantize=engine_config['quantize'] if quantize is None else quantize
+    key=(beam_width,quantize)
+    if key not in _engines:
+        from ai4bharat.transliteration import XlitEngine
+        engine=XlitEngine(beam_width=beam_width, src_script_type=engine_config['src_script_type'])
+        if quantize:
+            quantize_engine(engine)
+        _engines[key]=engine
+    return _engines[key]
+
+
+def init_worker(config:dict, torch_threads:int)->None:
+    """
+    Initializer of inference pool workers.
+
+    It only pins the thread counts and records the engine settings of the parent, the engine
+    itself is loaded lazily by the first batch the worker receives.
+    """
+    engine_config.update(config)
+    pin_threads(torch_threads,engine_config['interop_threads'])
@@ -0,0 +1,6 @@
+import os
+import sys
+
+root=os.path.join(os.path.dirname(os.path.abspath(__file__)),'..')
+sys.path.append(root)
+sys.path.append(os.path.join(root,'src'))
@@ -0,0 +1,28 @@
+import pytest
+from adaptive_batch import AdaptiveBatcher,merge_batch_stats
+
+
+class UpperReplacer:
+    """
+    Stand-in for MemoryWordReplacer.
+    """
+    def replace_batches(self, batch, use_placeholder=True):
+        return [text.upper() for text in batch],[['']]*len(batch)
+
+
+def test_merged_rows_match_the_dataset_on_two_workers(tmp_path):
+    datasets=pytest.importorskip('datasets')
+    stats_dir=str(tmp_path/'stats')
+    batcher=AdaptiveBatcher(UpperReplacer(),initial_chars=64,min_chars=16,stats_dir=stats_dir)
+
+    texts=[f'line {i} '*(i%5+1) for i in range(250)]
+    ds=datasets.Dataset.from_dict({'text':texts}).map(
+        lambda z:dict(zip(['transliterated','missing_words'],batcher.replace_batches(z['text']))),
+        batched=True,
+        batch_size=40,
+        num_proc=2,
+        )
+
+    stats=merge_batch_stats(stats_dir)
+    assert ds['transliterated']==[text.upper() for text in texts]
+    assert (stats['rows'],stats['chars'],stats['workers'])==(250,sum(map(len,texts)),2)
@@ -0,0 +1,14 @@
+import pytest
+
+
+def test_classify_words_splits_mixed_rows():
+    pytest.importorskip('tqdm')
+    pytest.importorskip('numerize')
+    pytest.importorskip('pandas')
+    from transliterate_unique_words import classify_words
+
+    rows=['नमस्ते दुनिया','hello नमस्ते','नमस्ते','क्या?',None,'a,b','नया।','नमस्ते दुनिया','123']
+    words,sentences=classify_words(rows,'Deva')
+
+    assert words==['नमस्ते','दुनिया','क्या','नया']
+    assert sentences==['hello नमस्ते','a,b','123']
@@ -0,0 +1,49 @@
+import json
+import pytest
+from dict_io import ShardWriter
+
+
+class Crash(Exception):
+    pass
+
+
+def crash_before_manifest(writer, items):
+    # the process dies in the middle of a write, after the manifest was last saved
+    def save_manifest():
+        writer.file.write(b'["torn", "wri')
+        writer.file.flush()
+        raise Crash()
+    writer._save_manifest=save_manifest
+    with pytest.raises(Crash):
+        writer.append(items)
+    writer.close()
+
+
+def test_crash_in_new_shard_before_manifest_save(tmp_path):
+    writer=ShardWriter(str(tmp_path),shard_size=2)
+    writer.append([('a','A'),('b','B')])
+    # starts part-00001 and writes to it, but the manifest never records it
+    crash_before_manifest(writer,[('c','C')])
+
+    writer=ShardWriter(str(tmp_path),shard_size=2)
+    assert writer.done=={'a':'A','b':'B'}
+    writer.append([('c','C'),('d','D')])
+    writer.close()
+
+    writer=ShardWriter(str(tmp_path),shard_size=2)
+    assert writer.done=={'a':'A','b':'B','c':'C','d':'D'}
+    writer.compact(str(tmp_path/'out.json'))
+    with open(tmp_path/'out.json',encoding='utf-8') as file:
+        assert json.load(file)=={'a':'A','b':'B','c':'C','d':'D'}
+
+
+def test_crash_in_recorded_shard_before_manifest_save(tmp_path):
+    writer=ShardWriter(str(tmp_path),shard_size=10)
+    writer.append([('a','A')])
+    crash_before_manifest(writer,[('b','B')])
+
+    writer=ShardWriter(str(tmp_path),shard_size=10)
+    assert writer.done=={'a':'A'}
+    writer.append([('c','C')])
+    writer.close()
+    assert ShardWriter(str(tmp_path),shard_size=10).done=={'a':'A','c':'C'}
@@ -0,0 +1,27 @@
+import json
+import pytest
+from line_cache import LineCache,merge_line_stats
+
+
+def test_merged_counts_cover_every_line_of_every_worker(tmp_path):
+    datasets=pytest.importorskip('datasets')
+    from MemoryWordReplacer import MemoryWordReplacer
+
+    dictionary_path=tmp_path/'hin_Deva.json'
+    dictionary_path.write_text(json.dumps({'नमस्ते':'namaste','दुनिया':'duniya'},ensure_ascii=False),encoding='utf-8')
+    stats_dir=str(tmp_path/'stats')
+    replacer=MemoryWordReplacer(str(dictionary_path),src_lang='hin_Deva',line_cache=LineCache(stats_dir=stats_dir))
+
+    texts=[f'नमस्ते दुनिया {i%7}\nदुनिया' for i in range(250)]
+    ds=datasets.Dataset.from_dict({'text':texts}).map(
+        lambda z:dict(zip(['transliterated','missing_words'],replacer.replace_batches(z['text']))),
+        batched=True,
+        batch_size=16,
+        num_proc=2,
+        )
+
+    stats=merge_line_stats(stats_dir)
+    assert ds.num_rows==250
+    assert (stats['lines'],stats['workers'])==(500,2)
+    # every worker keeps its own cache of the 8 distinct lines
+    assert stats['misses']==16
@@ -0,0 +1,36 @@
+import argparse
+import pytest
+
+
+def stage_args(tmp_path):
+    return argparse.Namespace(
+        langs=['hin_Deva'],
+        dataset_path=str(tmp_path/'{lang}'/'*.parquet'),
+        dictionary_path=str(tmp_path/'{lang}.json'),
+        work_dir=str(tmp_path/'pipeline'),
+        file_type='parquet',
+        text_column='translated',
+        id_column='doc_id',
+        cache_dir=str(tmp_path/'.cache'),
+        batch_size=16,
+        xlit_batch_size=64,
+        max_workers=4,
+        stage_workers=None,
+        )
+
+
+def test_transliterate_stage_parses_and_names_its_output(tmp_path):
+    pytest.importorskip('tqdm')
+    pytest.importorskip('numerize')
+    from run import language_stages
+    from transliterate_unique_words import get_parser,dictionary_output_path
+    from normalizer import mapping_dict
+
+    stages={stage.name:stage for stage in language_stages('hin_Deva',stage_args(tmp_path))}
+    stage=stages['transliterate']
+    argv=[part.replace('{workers}','1') for part in stage.command[2:]]
+    args=get_parser().parse_args(argv)
+
+    assert mapping_dict[args.src_lang]=='hi'
+    assert dictionary_output_path(args.output_json_path,args.src_lang,args.output_format)==stage.outputs[0]
+    assert stages['update_dict'].inputs[1]==stage.outputs[0]
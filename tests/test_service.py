@@ -0,0 +1,62 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+import pytest
+
+pytest.importorskip('tqdm')
+from service import MicroBatcher,create_server
+
+
+class UpperReplacer:
+    """
+    Stand-in for MemoryWordReplacer, failing on lines like the real one does on None.
+    """
+    def replace_batches(self, batch, use_placeholder=True):
+        return [line.upper() for line in batch],[['']]*len(batch)
+
+
+@pytest.fixture
+def server():
+    batcher=MicroBatcher(UpperReplacer(),max_batch_size=64,max_delay=0.05)
+    server=create_server({'hin_Deva':batcher},port=0)
+    threading.Thread(target=server.serve_forever,daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}',batcher
+    server.shutdown()
+    server.server_close()
+    batcher.close()
+
+
+def post(url, payload):
+    request=urllib.request.Request(f'{url}/transliterate',data=json.dumps(payload).encode('utf-8'))
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status,json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code,json.loads(e.read())
+
+
+def test_lines_must_be_a_list_of_strings(server):
+    url,_=server
+    assert post(url,{'src_lang':'hin_Deva','lines':'xyz'})[0]==400
+    assert post(url,{'src_lang':'hin_Deva','lines':['a',None]})[0]==400
+    assert post(url,{'src_lang':'hin_Deva','lines':['a']})==(200,{'transliterated':['A'],'missing_words':[['']]})
+
+
+def test_failing_request_does_not_fail_its_batch(server):
+    _,batcher=server
+    results={}
+
+    def submit(name, lines):
+        try:
+            results[name]=batcher.submit(lines,timeout=5)
+        except Exception as e:
+            results[name]=e
+
+    threads=[threading.Thread(target=submit,args=('good',['a','b'])),threading.Thread(target=submit,args=('bad',[None]))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results['good']==(['A','B'],[[''],['']])
+    assert isinstance(results['bad'],AttributeError)